@@ -1,181 +1,340 @@
-import logging
-from models import get_model, cache_model
-from joblib import load
-from STT import stt
-from TTS import tts 
-from picovoice import WakeWordDetector
-import os
-import govee
-from ollama import Ollama
-from Weather import weather_call
-'''
-Error log:
-Train sentiment analysis for salutations. Or some way to handle Error vs Success vs Again
-Train initial intent detector - create dataset for that
-Train chembot
-fix IOT issues
-Add VTT andN TTS
-Add user recognition - lowest priority.
-Turn = immediate IOT- turn off music included
-More robust IOT handling. I can do more than "Turn" {device} {state} in that order
-Volume control for spotify
-Starting spotify when not previously playing music.
-More robust song queries
-Essentially, retrain both IOT and Music because theyre fucked.
-Full train PicoVoice
-Add basic assistant tasks like time or
-include typos in training data
-'''
-# Configuration
-logging.basicConfig(
-    filename='log_atom_interactions.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S')
-
-logger = logging.getLogger(__name__)
-
-essential_models = [
-    'Music_action_label_encoder.pkl',
-    'Music_target_label_encoder.pkl',
-    'Music_GradientBoosting_target_pipeline.pkl',
-    'Music_GradientBoosting_action_pipeline.pkl',
-    'Music_Parameter_Classification',
-    'Intent_SVC_model.joblib',
-    'Salutation_SVC_model.joblib'
-]
-
-vectorizers_transformers = {
-    'Salutation': ('Salutation_vectorizer_Utterance.joblib', 'Salutation_tfidf_Utterance.joblib'),
-    'Intent': ('Intent_vectorizer_Command.joblib', 'Intent_tfidf_Command.joblib')
-}
-
-# Initialize TTS
-tts_service = tts(project_id="enhanced-option-413003", suffix="my-api-key")
-
-def load_models(model_names):
-    """Load and cache models."""
-    model_count = 0
-    for model_name in model_names:
-        model = get_model(model_name)
-        cache_model(model_name, model)
-        model_count += 1
-    logger.info(f"Loaded and cached {model_count} models")
-
-def load_model_and_tools(model_file, vectorizer_file, transformer_file):
-    """Load the trained model and the pre-processing tools."""
-    model = load(model_file)
-    vectorizer = load(vectorizer_file)
-    transformer = load(transformer_file)
-    return model, vectorizer, transformer
-
-def preprocess_and_predict(model, vectorizer, transformer, text):
-    """Preprocess the text and predict using the model."""
-    text_counts = vectorizer.transform([text])
-    text_tfidf = transformer.transform(text_counts)
-    prediction = model.predict(text_tfidf)[0]
-    return prediction
-
-def control(phrase):
-    govee.control(phrase)
-
-def listen():
-    return stt.short_speak()
-
-def speak(output):
-    tts_service.speak(output)
-
-def check_exit(utterance):
-    salutation_model, salutation_vectorizer, salutation_transformer = load_model_and_tools(
-        'Salutation_SVC_model.joblib', 'Salutation_vectorizer_Utterance.joblib', 'Salutation_tfidf_Utterance.joblib')
-    intent_model, intent_vectorizer, intent_transformer = load_model_and_tools(
-        'Intent_SVC_model.joblib', 'Intent_vectorizer_Command.joblib', 'Intent_tfidf_Command.joblib')
-
-    salutation = preprocess_and_predict(salutation_model, salutation_vectorizer, salutation_transformer, utterance)
-    logger.info(f"Salutation detected: {salutation}")
-
-    if salutation == "General":
-        intent = preprocess_and_predict(intent_model, intent_vectorizer, intent_transformer, utterance)
-        logger.info(f"Intent detected: {intent}")
-        return intent
-    elif salutation == "Exit":
-        speak("Understood. I'll go into standby until you request me.")
-        return "Exit"
-    else:
-        logger.info("Non-general salutation detected.")
-        return "Blank"
-
-def intent_finder(intent, utterance):
-    if intent in ["Exit"]:
-        return "Exit"
-    
-    if intent in ["News", "ScientificResearch", "IoT", "Lexicon", "Music", "Assistant", "Weather", "Blank"]:
-        speak("Happily Sir.")
-        speak(f"Routing you to: {intent}")
-        logger.info(f"Routing to {intent} functionality for utterance: {utterance}")
-        if intent == "Music":
-            music(utterance)
-        elif intent == "IoT":
-            control(utterance)
-        elif intent == "Blank":
-            logger.info("Detected 'Blank' intent.")
-        elif intent == "Weather":
-            speak(weather_call())
-        elif intent == 'ScientificResearch' or "News":
-            llm = Ollama()
-            try:
-                while True:
-                    speak("I understand you want me to give a more detailed response, please hold while I load this rather hefty model")
-                    result = llm.generate_response(utterance)
-                    speak(result)
-                    utterance = listen()
-                    exit = check_exit(utterance)
-                    if exit != "General":
-                        break
-            except Exception as e:
-                print(e)
-            logger.info(f"Utterance: {utterance} /n Response: {result}")
-        else:
-            speak(f"I don't have the functionality for {intent} yet. Blame my creator.")
-            logger.info(f"Intent {intent} requested but not yet implemented for utterance: {utterance}")
-    else:
-        speak("Sorry, I don't understand that request.")
-        logger.info(f"Unknown intent classification: {intent} for utterance: {utterance}")
-    return "Continue"
-
-def music(utterance):
-    import SpotifyController
-    spotify_controller = SpotifyController.SpotifyController()
-    spotify_controller.interpret_command(utterance)
-
-def log_interaction(utterance):
-    logger.info(f"User interaction: {utterance}")
-def welcome():
-    speak("Hello, I am an Artificial Intelligence in Training. Please wait while I get ready to assist you.")
-    load_models(essential_models)
-    speak("Initialization complete. I am ready to help!")
-
-def detector():
-    detector = WakeWordDetector()
-    detector.start()
-    detector.wait_for_wake_word()
-
-def main_loop():
-    welcome()
-    while True:
-        detector()
-        while True:
-            utterance = listen()
-            if not utterance:
-                break  # Break the inner loop if no utterance is recognized
-            log_interaction(utterance)
-            intent = check_exit(utterance)
-            if intent == "Blank" or intent == "Exit":
-                break
-            action_result = intent_finder(intent, utterance)
-            if action_result == "Exit":
-                break
-
-
-if __name__ == "__main__":
-    main_loop()
+import logging
+import time
+import threading
+import contextvars
+from atom_logging import setup_logging
+from models import get_model, cache_model, ModelWatcher, registry, resolve_models
+from STT import stt
+from TTS import tts 
+from picovoice import WakeWordDetector
+import os
+import govee
+import tts_cache
+from ollamaLLM import OllamaSession
+from answer_cache import AnswerCache, CACHE_DIR as ANSWER_CACHE_DIR
+from llm_scheduler import scheduler
+from Weather import weather_call, WeatherRefresher
+from nlu_cache import nlu_cache
+from nlu_batch import predict_chunk, CLASSIFIERS, ONLINE_CLASSIFIERS
+from router import router
+from skills import skill, dispatch, warm_up_all
+from tracing import span, new_turn, enable_tracing, install_http_tracing
+'''
+Error log:
+Train sentiment analysis for salutations. Or some way to handle Error vs Success vs Again
+Train initial intent detector - create dataset for that
+Train chembot
+fix IOT issues
+Add VTT andN TTS
+Add user recognition - lowest priority.
+Turn = immediate IOT- turn off music included
+More robust IOT handling. I can do more than "Turn" {device} {state} in that order
+Volume control for spotify
+Starting spotify when not previously playing music.
+More robust song queries
+Essentially, retrain both IOT and Music because theyre fucked.
+Full train PicoVoice
+Add basic assistant tasks like time or
+include typos in training data
+'''
+# Configuration
+setup_logging()
+
+logger = logging.getLogger(__name__)
+
+# Preloaded at startup; models_manifest.json decides which artifact serves each role
+essential_roles = [
+    'music-action-encoder',
+    'music-target-encoder',
+    'music-target',
+    'music-action',
+    'music-parameter',
+    'intent', 'intent-vectorizer', 'intent-tfidf',
+    'salutation', 'salutation-vectorizer', 'salutation-tfidf',
+]
+essential_models = [name for name in resolve_models(*essential_roles) if name]
+
+classifier_models = [path for files in list(CLASSIFIERS.values()) + list(ONLINE_CLASSIFIERS.values())
+                     for path in files if path]
+
+# Cached parses are dropped as soon as any of these files is retrained
+nlu_cache.watch(*classifier_models)
+
+def warm_up_classifier(tools):
+    model, vectorizer, transformer = (list(tools) + [None])[:3]
+    predict_chunk(model, vectorizer, transformer, ["hello there"])
+
+# Swaps retrained models in while running; each classifier is swapped together with its vectorizers
+model_watcher = ModelWatcher(on_swap=nlu_cache.clear)
+for classifier_files in list(CLASSIFIERS.values()) + list(ONLINE_CLASSIFIERS.values()):
+    model_watcher.watch(*[path for path in classifier_files if path], warm_up_group=warm_up_classifier)
+model_watcher.watch(*[name for name in essential_models if name not in classifier_models])
+
+# Initialize TTS
+tts_service = tts(project_id="enhanced-option-413003", suffix="my-api-key")
+
+# Keeps the weather report and its audio ready between requests
+weather_refresher = WeatherRefresher(synthesize=tts_service.synthesize_speech)
+
+def load_models(model_names):
+    """Load and cache models."""
+    model_count = 0
+    for model_name in model_names:
+        model = get_model(model_name)
+        cache_model(model_name, model)
+        model_count += 1
+    logger.info(f"Loaded and cached {model_count} models")
+
+@skill("IoT", warm_up=govee.Govee.get_lan, timeout=15)
+def control(phrase):
+    govee.control(phrase)
+
+class WebTurn:
+    """
+    A turn requested over the web API: what Atom said, and whether the client
+    is still waiting. on_event(event, data) is told as the turn progresses.
+    """
+    def __init__(self, on_event=None):
+        self.replies = []
+        self.cancelled = threading.Event()
+        self.on_event = on_event
+
+    def emit(self, event, data):
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+# Set while a web request is being handled; speech is collected for the response instead of played
+web_turn = contextvars.ContextVar('web_turn', default=None)
+
+def is_flask_mode():
+    return web_turn.get() is not None
+
+def listen():
+    if is_flask_mode():
+        return None  # Follow-ups arrive as new requests
+    return stt.short_speak()
+
+def audio_url(text):
+    """URL the web API serves the synthesized text from, or None if synthesis failed."""
+    try:
+        with span('tts_synthesis', chars=len(text), web=True):
+            return tts_cache.audio_url(tts_service.cached_audio(text))
+    except Exception as e:
+        logger.error(f"Could not synthesize web reply: {e}")
+        return None
+
+def audio_urls(turn):
+    """One URL per reply of a web turn, so replies that repeat are served from the TTS cache."""
+    return [audio_url(reply) for reply in turn.replies]
+
+def speak(output):
+    turn = web_turn.get()
+    if turn is not None:
+        # The browser plays the reply; nothing is played on this machine
+        turn.replies.append(output)
+        turn.emit('reply', {'text': output})
+        if turn.on_event is not None:
+            turn.emit('audio', {'text': output, 'url': audio_url(output)})
+        return
+    tts_service.speak(output)
+
+@skill("Weather", timeout=30)
+def speak_weather(utterance=None):
+    ready = weather_refresher.get_report()
+    if ready is None:
+        speak(weather_call())  # Refresher has not completed its first pass yet
+        return
+    conditions, audio, sun_event = ready
+    if not audio:
+        speak(f"{conditions}\n{sun_event}")
+        return
+    if is_flask_mode():
+        tts_service.store_audio(conditions, audio)  # Served to the browser straight from the TTS cache
+        speak(conditions)
+    else:
+        print(f"Playing pre-rendered weather report: {conditions}")
+        with span('tts_playback', prerendered=True):
+            tts_service.play_audio(audio)
+    speak(sun_event)  # Worded now, so the countdown is never stale
+
+def parse_utterance(utterance):
+    """Return (salutation, intent) for the utterance, from the NLU cache when possible."""
+    cached = nlu_cache.get(utterance, 'salutation')
+    if cached is not None:
+        return cached['salutation'], cached.get('intent')
+
+    # Rules first, then the salutation model, then the intent model only if still unsure
+    parse = router.route(utterance)
+    nlu_cache.update(utterance, **parse)
+    return parse['salutation'], parse['intent']
+
+def check_exit(utterance):
+    salutation, intent = parse_utterance(utterance)
+    logger.info(f"Salutation detected: {salutation}")
+
+    if salutation == "General":
+        logger.info(f"Intent detected: {intent}")
+        return intent
+    elif salutation == "Exit":
+        speak("Understood. I'll go into standby until you request me.")
+        return "Exit"
+    else:
+        logger.info("Non-general salutation detected.")
+        return "Blank"
+
+# Intents the classifier can produce; the ones without a registered skill get a polite refusal
+KNOWN_INTENTS = {"News", "ScientificResearch", "IoT", "Lexicon", "Music", "Assistant", "Weather", "Blank"}
+
+def intent_finder(intent, utterance):
+    if intent in ["Exit"]:
+        return "Exit"
+    
+    if intent in KNOWN_INTENTS:
+        speak("Happily Sir.")
+        speak(f"Routing you to: {intent}")
+        logger.info(f"Routing to {intent} functionality for utterance: {utterance}")
+        if not dispatch(intent, utterance):
+            speak(f"I don't have the functionality for {intent} yet. Blame my creator.")
+            logger.info(f"Intent {intent} requested but not yet implemented for utterance: {utterance}")
+    else:
+        speak("Sorry, I don't understand that request.")
+        logger.info(f"Unknown intent classification: {intent} for utterance: {utterance}")
+    return "Continue"
+
+@skill("Blank")
+def blank(utterance):
+    logger.info("Detected 'Blank' intent.")
+
+def spotify_controller():
+    import SpotifyController
+    return SpotifyController.get_controller()
+
+@skill("Music", setup=spotify_controller, timeout=15)
+def music(utterance, controller):
+    controller.interpret_command(utterance)
+
+def research_session(cache_dir=ANSWER_CACHE_DIR):
+    return OllamaSession(answer_cache=AnswerCache(cache_dir), scheduler=scheduler)
+
+# Concurrent web users each hold a conversation; the scheduler bounds how many generate at once
+@skill("ScientificResearch", "News", setup=research_session, warm_up=OllamaSession.preload, max_concurrent=16)
+def research(utterance, session):
+    # Follow-up questions share one chat history, so the model keeps the context
+    conversation = session.fork()
+    turn = web_turn.get()
+    cancelled = turn.cancelled if turn is not None else None
+    on_part = (lambda part: turn.emit('token', {'text': part})) if turn is not None else None
+    speak("I understand you want me to give a more detailed response, please hold while I load this rather hefty model")
+    try:
+        while True:
+            result = conversation.ask(utterance, cancelled, on_part)
+            logger.info(f"Utterance: {utterance} /n Response: {result}")
+            speak(result)
+            utterance = listen()
+            if not utterance or check_exit(utterance) in ("Exit", "Blank"):
+                break
+    except Exception as e:
+        print(e)
+
+def log_interaction(utterance):
+    logger.info(f"User interaction: {utterance}")
+
+def log_turn(intent, outcome, turn_start):
+    latency_ms = round((time.perf_counter() - turn_start) * 1000, 1)
+    logger.info(f"Turn handled: {intent} -> {outcome}",
+                extra={"intent": intent, "outcome": outcome, "latency_ms": latency_ms})
+
+def start_up():
+    """Load the essential models and start the background refreshers and warm-ups."""
+    plan = registry.load_plan(essential_roles)
+    expected_ms = sum(step.get('load_ms') or 0 for step in plan)
+    logger.info(f"Loading {len(plan)} models (expected {expected_ms:.0f} ms from the manifest)")
+    load_models([step['name'] for step in plan])
+    registry.save()
+    weather_refresher.start()
+    model_watcher.start()
+    warm_up_all()
+
+def welcome():
+    speak("Hello, I am an Artificial Intelligence in Training. Please wait while I get ready to assist you.")
+    start_up()
+    speak("Initialization complete. I am ready to help!")
+
+def prepare_web_mode():
+    """Get ready to serve the web API: no wake word, nothing played on this machine."""
+    enable_tracing()
+    install_http_tracing()
+    start_up()
+
+def handle_text(utterance, turn=None):
+    """Handle one utterance from the web API and return what Atom said in reply."""
+    turn = turn or WebTurn()
+    token = web_turn.set(turn)
+    try:
+        new_turn()
+        turn.emit('recognized', {'text': utterance})
+        with span('turn', web=True) as traced:
+            log_interaction(utterance)
+            turn_start = time.perf_counter()
+            with span('check_exit'):
+                intent = check_exit(utterance)
+            traced['intent'] = intent
+            turn.emit('route', {'intent': intent})
+            if intent == "Blank" or intent == "Exit":
+                outcome = intent
+            else:
+                with span('intent_finder', intent=intent):
+                    outcome = intent_finder(intent, utterance)
+            log_turn(intent, outcome, turn_start)
+    finally:
+        web_turn.reset(token)
+    return " ".join(turn.replies)
+
+def handle_audio(filepath, turn=None):
+    """Transcribe an uploaded recording and handle it; returns (recognized_text, response_text)."""
+    with span('listen', web=True):
+        utterance = stt.transcribe_file(filepath)
+    if not utterance:
+        return None, None
+    return utterance, handle_text(utterance, turn)
+
+def detector():
+    detector = WakeWordDetector()
+    detector.start()
+    detector.wait_for_wake_word()
+
+def main_loop():
+    enable_tracing()
+    install_http_tracing()
+    welcome()
+    while True:
+        new_turn()  # The wake word is part of the turn it opens
+        with span('wake_word'):
+            detector()
+        first_turn = True
+        while True:
+            if not first_turn:
+                new_turn()
+            first_turn = False
+            with span('turn') as turn:
+                with span('listen'):
+                    utterance = listen()
+                if not utterance:
+                    break  # Break the inner loop if no utterance is recognized
+                log_interaction(utterance)
+                turn_start = time.perf_counter()
+                with span('check_exit'):
+                    intent = check_exit(utterance)
+                turn['intent'] = intent
+                if intent == "Blank" or intent == "Exit":
+                    log_turn(intent, intent, turn_start)
+                    break
+                with span('intent_finder', intent=intent):
+                    action_result = intent_finder(intent, utterance)
+                log_turn(intent, action_result, turn_start)
+                if action_result == "Exit":
+                    break
+
+
+if __name__ == "__main__":
+    main_loop()
@@ -1,208 +1,387 @@
-import os
-import logging
-from models import get_model
-import spacy
-from dotenv import load_dotenv
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-
-# Configure the logging system
-logging.basicConfig(
-    filename='log_atom_interactions.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-'''
-Error log:
-Retrain Target classifier. "Play back in black" should not play backstreet boys. Provide more data regarding single song no context requests
-Activate device upon intialization. songs wont play unless the device is already playing music, not the best for a speaker system.
-When retraining, make sure to differentiate between rewind and replay. Spotify does both and currently regardless of wording it will play the last completed track
-When retraining, be sure to include odd orders of words. Ex. Attempting to play: search_query=artist:ACDC back in black.
-Decrease volume by 20 - somehow doesnt work?
-'''
-logger = logging.getLogger(__name__)
-
-class SpotifyController:
-    def __init__(self):
-        self.sp = self.authenticate_spotify()
-        self.volume_level = self.get_current_volume()  # Initialize volume_level with the current volume
-        self.load_models()
-
-    def authenticate_spotify(self):
-        load_dotenv()
-        client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-
-        try:
-            auth_manager = SpotifyOAuth(client_id=client_id,
-                                        client_secret=client_secret,
-                                        redirect_uri="http://localhost:8888/callback",
-                                        scope="user-modify-playback-state user-read-playback-state user-read-currently-playing")
-            logger.info("Spotify authentication successful")
-            return spotipy.Spotify(auth_manager=auth_manager)
-        except Exception as e:
-            logger.error(f"Failed to authenticate with Spotify: {e}")
-            return None
-
-    def load_models(self):
-        try:
-            # Load Spacy model
-            self.nlp = get_model("Music_Parameter_Classification")
-
-            # Load Joblib pipelines and label encoders
-            self.action_pipeline = get_model('Music_GradientBoosting_action_pipeline.pkl')
-            self.target_pipeline = get_model("Music_GradientBoosting_target_pipeline.pkl")
-            self.action_label_encoder = get_model("Music_action_label_encoder.pkl")
-            self.target_label_encoder = get_model("Music_target_label_encoder.pkl")
-
-            logger.info("Models loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading models: {e}")
-
-    def classify_utterance(self, utterance):
-        try:
-            # Process the utterance using Spacy
-           # doc = self.nlp(utterance)
-
-            # Classify action
-            action_pred = self.action_pipeline.predict([utterance])
-            action = self.action_label_encoder.inverse_transform(action_pred)[0]
-            logger.info(f"Predicted action: {action}")
-
-            # Classify target only if action is 'play' or 'volume'
-            target = None
-            parameter = None
-            if action in ['play', 'volume']:
-                target_pred = self.target_pipeline.predict([utterance])
-                target = self.target_label_encoder.inverse_transform(target_pred)[0]
-                logger.info(f"Predicted target: {target}")
-
-            if action == 'play':
-                doc = self.nlp(utterance)
-                parameter = " ".join([ent.text for ent in doc.ents])
-                logger.info(f"Extracted parameter: {parameter}")
-
-            return action, target, parameter
-        except Exception as e:
-            logger.error(f"Error classifying utterance '{utterance}': {e}")
-            return None, None, None
-
-    def play(self, search_query=None):
-        logger.info(f"Attempting to play: search_query={search_query}")
-        try:
-            if search_query:
-                results = self.sp.search(q=search_query, type='track', limit=1)
-                tracks = results['tracks']['items']
-                if tracks:
-                    self.sp.start_playback(uris=[tracks[0]['uri']])
-                    logger.info(f"Playing track: {tracks[0]['name']}")
-                else:
-                    logger.warning("No tracks found for your query.")
-            else:
-                logger.warning("No search query specified.")
-        except Exception as e:
-            logger.error(f"Error during playback operation: {e}")
-
-    def stop(self):
-        try:
-            self.sp.pause_playback()
-            logger.info("Playback stopped")
-        except Exception as e:
-            logger.error(f"Error trying to stop playback: {e}")
-
-    def skip(self):
-        try:
-            self.sp.next_track()
-            logger.info("Skipped to next track")
-        except Exception as e:
-            logger.error(f"Error trying to skip track: {e}")
-
-    def rewind(self):
-        try:
-            self.sp.previous_track()
-            logger.info("Rewound to previous track")
-        except Exception as e:
-            logger.error(f"Error trying to rewind track: {e}")
-
-    def adjust_volume(self, direction):
-        try:
-            new_volume_level = int(direction)  # Assuming direct volume level input
-            if 0 <= new_volume_level <= 100:
-                self.volume_level = new_volume_level
-                self.sp.volume(self.volume_level)  # Adjust the volume on Spotify
-                logger.info(f"Volume level set to: {self.volume_level}%")
-            else:
-                logger.warning("Volume level must be between 0 and 100.")
-                return
-        except ValueError:
-            volume = self.get_current_volume()
-            if direction.lower() in ["up"]:
-                self.volume_level = min(volume + 10, 100)
-                logger.info(f"Volume increased to: {self.volume_level}%")
-            elif direction.lower() in ["down"]:
-                self.volume_level = max(volume - 10, 0)
-                logger.info(f"Volume decreased to: {self.volume_level}%")
-            else:
-                logger.warning("Invalid volume direction. Use 'increase', 'decrease', or a number between 0 and 100.")
-
-        try:
-            self.sp.volume(self.volume_level)  # Adjust the volume on Spotify
-        except Exception as e:
-            logger.error(f"Error adjusting volume: {e}")
-
-    def interpret_command(self, utterance):
-        action, target, parameter = self.classify_utterance(utterance)
-        logger.info(f"Interpreting: {utterance}")
-        try:
-            if action == "play":
-                if target in ["song", "artist", "genre", "album", "playlist"]:
-                    search_query = f"{target}:{parameter}" if target != "song" else parameter
-                    self.play(search_query=search_query)
-                else:
-                    logger.warning(f"Unsupported target for action 'play': {target}")
-            elif action in ["stop", "pause"]:
-                self.stop()
-            elif action == "skip":
-                self.skip()
-            elif action == "rewind":
-                self.rewind()
-            elif action == "volume":
-                self.adjust_volume(target)
-            else:
-                logger.warning(f"Action '{action}' is not recognized. Please try again.")
-        except Exception as e:
-            logger.error(f"Error interpreting command '{utterance}': {e}")
-
-    def list_devices(self):
-        logger.info("Fetching available devices...")
-        try:
-            devices = self.sp.devices()
-            if 'devices' in devices:
-                for device in devices['devices']:
-                    logger.info(f"Device Name: {device['name']}, Device ID: {device['id']}, Type: {device['type']}, Active: {device['is_active']}")
-            else:
-                logger.warning("No devices found. Make sure your device is connected to Spotify.")
-        except Exception as e:
-            logger.error(f"Failed to fetch devices: {e}")
-
-    def get_current_volume(self):
-        try:
-            devices = self.sp.devices()
-            if 'devices' in devices:
-                for device in devices['devices']:
-                    if device['is_active']:
-                        logger.info(f"Current active device: {device['name']}, Volume Level: {device['volume_percent']}%")
-                        return device['volume_percent']
-                logger.warning("No active device found. Returning default volume level.")
-            else:
-                logger.warning("No devices found. Make sure your device is connected to Spotify.")
-        except Exception as e:
-            logger.error(f"Failed to fetch current volume level: {e}")
-
-        #return 50  # Return default volume level as fallback
-
-
-# if __name__ == "__main__":
-#     spotify_controller = SpotifyController()
-#     spotify_controller.interpret_command("play back in black by acdc")
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from atom_logging import setup_logging, read_interactions
+import models
+from models import get_model
+from music_nlu import (MusicNLU, ACTION_PIPELINE, TARGET_PIPELINE, ACTION_LABEL_ENCODER, TARGET_LABEL_ENCODER,
+                       PARAMETER_MODEL, PARAMETER_NER_MODEL)
+from nlu_cache import nlu_cache
+from router import router, match_rules
+import spacy
+from dotenv import load_dotenv
+import spotipy
+from spotipy.oauth2 import SpotifyOAuth
+
+# Configure the logging system
+setup_logging()
+'''
+Error log:
+Retrain Target classifier. "Play back in black" should not play backstreet boys. Provide more data regarding single song no context requests
+Activate device upon intialization. songs wont play unless the device is already playing music, not the best for a speaker system.
+When retraining, make sure to differentiate between rewind and replay. Spotify does both and currently regardless of wording it will play the last completed track
+When retraining, be sure to include odd orders of words. Ex. Attempting to play: search_query=artist:ACDC back in black.
+Decrease volume by 20 - somehow doesnt work?
+'''
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_CHECK_INTERVAL = 60
+
+SEARCH_CACHE_FILE = 'spotify_search_cache.json'
+SEARCH_CACHE_TTL = 7 * 24 * 3600
+SEARCH_CACHE_SIZE = 500
+SEARCH_PREWARM_COUNT = 25
+INTERACTION_LOG = 'log_atom_interactions.log'
+SEARCH_TARGETS = ["artist", "genre", "album", "playlist"]
+
+def parse_search_query(search_query):
+    """Split a search query built by interpret_command back into (target, parameter)."""
+    match = re.match(rf"^({'|'.join(SEARCH_TARGETS)}):(.*)$", search_query)
+    if match:
+        return match.group(1), match.group(2)
+    return "song", search_query
+
+class SearchCache:
+    """
+    Persistent LRU cache of track search results, keyed by normalized (target, parameter).
+    """
+    def __init__(self, path=SEARCH_CACHE_FILE, ttl=SEARCH_CACHE_TTL, max_size=SEARCH_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def normalize(target, parameter):
+        words = re.findall(r"\w+", (parameter or "").lower())
+        return f"{(target or 'song').lower()}|{' '.join(words)}"
+
+    def get(self, target, parameter):
+        key = self.normalize(target, parameter)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['stored_at'] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, target, parameter, uri, name, save=True):
+        """Store a result; pass save=False when adding a batch and call save() once after it."""
+        key = self.normalize(target, parameter)
+        with self.lock:
+            self.entries[key] = {'uri': uri, 'name': name, 'stored_at': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        if save:
+            self.save()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = OrderedDict(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Could not read search cache {self.path}: {e}")
+
+    def save(self):
+        # Held across the write so saves from the prewarm and request threads cannot interleave
+        with self.lock:
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(dict(self.entries), f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Could not write search cache {self.path}: {e}")
+
+def frequent_play_queries(log_path=INTERACTION_LOG, limit=SEARCH_PREWARM_COUNT):
+    """Return the most requested search queries from past 'Attempting to play' log lines."""
+    prefix = "Attempting to play: search_query="
+    counts = Counter()
+    for record in read_interactions(log_path, contains=prefix):
+        query = record['msg'].partition(prefix)[2]
+        if query and query != "None":
+            counts[query] += 1
+    return [query for query, _ in counts.most_common(limit)]
+
+class SpotifyController:
+    def __init__(self):
+        self.sp = self.authenticate_spotify()
+        # Device and volume state is read from Spotify once, on first need, and
+        # then kept current from the commands we send.
+        self.active_device = None
+        self.volume_level = None
+        self.search_cache = SearchCache()
+        self.models_generation = None
+        self.load_models()
+        self.start_token_refresh()
+        self.start_search_prewarm()
+
+    def authenticate_spotify(self):
+        load_dotenv()
+        client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+
+        try:
+            auth_manager = SpotifyOAuth(client_id=client_id,
+                                        client_secret=client_secret,
+                                        redirect_uri="http://localhost:8888/callback",
+                                        scope="user-modify-playback-state user-read-playback-state user-read-currently-playing")
+            logger.info("Spotify authentication successful")
+            return spotipy.Spotify(auth_manager=auth_manager)
+        except Exception as e:
+            logger.error(f"Failed to authenticate with Spotify: {e}")
+            return None
+
+    def start_token_refresh(self):
+        """Keep the OAuth token fresh in the background so commands never wait on a refresh."""
+        if self.sp is None:
+            return
+        thread = threading.Thread(target=self._token_refresh_loop, daemon=True)
+        thread.start()
+
+    def _token_refresh_loop(self):
+        auth_manager = self.sp.auth_manager
+        while True:
+            try:
+                token_info = auth_manager.cache_handler.get_cached_token()
+                if token_info and token_info['expires_at'] - time.time() < TOKEN_REFRESH_MARGIN:
+                    auth_manager.refresh_access_token(token_info['refresh_token'])
+                    logger.info("Spotify access token refreshed")
+            except Exception as e:
+                logger.error(f"Failed to refresh Spotify token: {e}")
+            time.sleep(TOKEN_CHECK_INTERVAL)
+
+    def start_search_prewarm(self):
+        """Resolve frequently played queries in the background so repeats skip the search."""
+        if self.sp is None:
+            return
+        thread = threading.Thread(target=self.prewarm_search_cache, daemon=True)
+        thread.start()
+
+    def prewarm_search_cache(self):
+        warmed = 0
+        for search_query in frequent_play_queries():
+            target, parameter = parse_search_query(search_query)
+            if self.search_cache.get(target, parameter):
+                continue
+            if self.search_track(search_query, save=False):
+                warmed += 1
+        if warmed:
+            self.search_cache.save()
+        logger.info(f"Search cache prewarmed with {warmed} queries")
+
+    def search_track(self, search_query, save=True):
+        """Return (uri, name) for the query, from the cache when possible."""
+        target, parameter = parse_search_query(search_query)
+        entry = self.search_cache.get(target, parameter)
+        if entry:
+            logger.info(f"Search cache hit: {search_query}")
+            return entry['uri'], entry['name']
+        results = self.sp.search(q=search_query, type='track', limit=1)
+        tracks = results['tracks']['items']
+        if not tracks:
+            return None
+        self.search_cache.put(target, parameter, tracks[0]['uri'], tracks[0]['name'], save)
+        return tracks[0]['uri'], tracks[0]['name']
+
+    def load_models(self):
+        try:
+            # Load Spacy model, trimmed to the NER component
+            self.nlp = get_model(PARAMETER_NER_MODEL)
+
+            # Load Joblib pipelines and label encoders
+            self.action_pipeline = get_model(ACTION_PIPELINE)
+            self.target_pipeline = get_model(TARGET_PIPELINE)
+            self.action_label_encoder = get_model(ACTION_LABEL_ENCODER)
+            self.target_label_encoder = get_model(TARGET_LABEL_ENCODER)
+
+            nlu_cache.watch(PARAMETER_MODEL, ACTION_PIPELINE, TARGET_PIPELINE, ACTION_LABEL_ENCODER,
+                            TARGET_LABEL_ENCODER)
+
+            # Action and target heads share one featurization pass
+            self.nlu = MusicNLU(self.action_pipeline, self.target_pipeline, self.action_label_encoder,
+                                self.target_label_encoder, self.nlp)
+            self.models_generation = models.model_generation
+
+            logger.info("Models loaded successfully")
+        except Exception as e:
+            logger.error(f"Error loading models: {e}")
+
+    def classify_utterance(self, utterance):
+        try:
+            cached = nlu_cache.get(utterance, 'action')
+            if cached is not None:
+                action, target, parameter = cached['action'], cached.get('target'), cached.get('parameter')
+            else:
+                start = time.perf_counter()
+                rule = match_rules(utterance)
+                if rule is not None and 'action' in rule:
+                    action, target, parameter = rule['action'], rule['target'], rule['parameter']
+                    tier = 'rules'
+                else:
+                    if self.models_generation != models.model_generation:
+                        self.load_models()  # A model was hot-swapped since MusicNLU was built
+                    action, target, parameter = self.nlu.classify(utterance)
+                    tier = 'models'
+                router.record('music', tier, time.perf_counter() - start)
+                nlu_cache.update(utterance, action=action, target=target, parameter=parameter)
+            logger.info(f"Predicted action: {action}")
+            if target is not None:
+                logger.info(f"Predicted target: {target}")
+            if parameter is not None:
+                logger.info(f"Extracted parameter: {parameter}")
+            return action, target, parameter
+        except Exception as e:
+            logger.error(f"Error classifying utterance '{utterance}': {e}")
+            return None, None, None
+
+    def play(self, search_query=None):
+        logger.info(f"Attempting to play: search_query={search_query}")
+        try:
+            if search_query:
+                track = self.search_track(search_query)
+                if track:
+                    uri, name = track
+                    self.sp.start_playback(uris=[uri])
+                    logger.info(f"Playing track: {name}")
+                else:
+                    logger.warning("No tracks found for your query.")
+            else:
+                logger.warning("No search query specified.")
+        except Exception as e:
+            logger.error(f"Error during playback operation: {e}")
+
+    def stop(self):
+        try:
+            self.sp.pause_playback()
+            logger.info("Playback stopped")
+        except Exception as e:
+            logger.error(f"Error trying to stop playback: {e}")
+
+    def skip(self):
+        try:
+            self.sp.next_track()
+            logger.info("Skipped to next track")
+        except Exception as e:
+            logger.error(f"Error trying to skip track: {e}")
+
+    def rewind(self):
+        try:
+            self.sp.previous_track()
+            logger.info("Rewound to previous track")
+        except Exception as e:
+            logger.error(f"Error trying to rewind track: {e}")
+
+    def adjust_volume(self, direction):
+        try:
+            new_volume_level = int(direction)  # Assuming direct volume level input
+            if 0 <= new_volume_level <= 100:
+                self.volume_level = new_volume_level
+                logger.info(f"Volume level set to: {self.volume_level}%")
+            else:
+                logger.warning("Volume level must be between 0 and 100.")
+                return
+        except ValueError:
+            volume = self.volume_level if self.volume_level is not None else self.get_current_volume()
+            if volume is None:
+                logger.warning("Current volume unknown; cannot adjust relative to it.")
+                return
+            if direction.lower() in ["up"]:
+                self.volume_level = min(volume + 10, 100)
+                logger.info(f"Volume increased to: {self.volume_level}%")
+            elif direction.lower() in ["down"]:
+                self.volume_level = max(volume - 10, 0)
+                logger.info(f"Volume decreased to: {self.volume_level}%")
+            else:
+                logger.warning("Invalid volume direction. Use 'increase', 'decrease', or a number between 0 and 100.")
+                return
+
+        try:
+            self.sp.volume(self.volume_level)  # Adjust the volume on Spotify
+        except Exception as e:
+            self.volume_level = None  # Re-read from Spotify next time
+            logger.error(f"Error adjusting volume: {e}")
+
+    def interpret_command(self, utterance):
+        action, target, parameter = self.classify_utterance(utterance)
+        logger.info(f"Interpreting: {utterance}")
+        try:
+            if action == "play":
+                if target in ["song", "artist", "genre", "album", "playlist"]:
+                    search_query = f"{target}:{parameter}" if target != "song" else parameter
+                    self.play(search_query=search_query)
+                else:
+                    logger.warning(f"Unsupported target for action 'play': {target}")
+            elif action in ["stop", "pause"]:
+                self.stop()
+            elif action == "skip":
+                self.skip()
+            elif action == "rewind":
+                self.rewind()
+            elif action == "volume":
+                self.adjust_volume(target)
+            else:
+                logger.warning(f"Action '{action}' is not recognized. Please try again.")
+        except Exception as e:
+            logger.error(f"Error interpreting command '{utterance}': {e}")
+
+    def list_devices(self):
+        logger.info("Fetching available devices...")
+        try:
+            devices = self.sp.devices()
+            if 'devices' in devices:
+                for device in devices['devices']:
+                    logger.info(f"Device Name: {device['name']}, Device ID: {device['id']}, Type: {device['type']}, Active: {device['is_active']}")
+            else:
+                logger.warning("No devices found. Make sure your device is connected to Spotify.")
+        except Exception as e:
+            logger.error(f"Failed to fetch devices: {e}")
+
+    def get_current_volume(self):
+        try:
+            devices = self.sp.devices()
+            if 'devices' in devices:
+                for device in devices['devices']:
+                    if device['is_active']:
+                        logger.info(f"Current active device: {device['name']}, Volume Level: {device['volume_percent']}%")
+                        self.active_device = device
+                        self.volume_level = device['volume_percent']
+                        return device['volume_percent']
+                logger.warning("No active device found. Returning default volume level.")
+            else:
+                logger.warning("No devices found. Make sure your device is connected to Spotify.")
+        except Exception as e:
+            logger.error(f"Failed to fetch current volume level: {e}")
+
+        #return 50  # Return default volume level as fallback
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_controller():
+    """Return the process-wide controller, creating it on first use."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = SpotifyController()
+        return _controller
+
+
+# if __name__ == "__main__":
+#     spotify_controller = SpotifyController()
+#     spotify_controller.interpret_command("play back in black by acdc")
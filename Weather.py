@@ -1,117 +1,237 @@
-# weather_module.py
-import os
-import requests
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
-
-# Load the API key from the .env file
-load_dotenv()
-API_KEY = os.getenv("WEATHER_API_KEY")
-
-if not API_KEY:
-    raise ValueError("API key is missing. Please check your .env file.")
-
-class WeatherData:
-    def __init__(self, city_name="High Point", units='imperial'):
-        self.city_name = city_name
-        self.units = units
-        self.coordinates = self.get_coordinates()
-
-    def get_coordinates(self):
-        """Fetch the geographical coordinates of the city using the Geocoder API."""
-        geocode_url = f"http://api.openweathermap.org/geo/1.0/direct?q={self.city_name}&limit=1&appid={API_KEY}"
-        response = requests.get(geocode_url)
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise ValueError(f"City not found: {self.city_name}")
-        return data[0]['lat'], data[0]['lon']
-
-    def fetch_data(self, url):
-        """Generic function to fetch data from the given URL."""
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-
-    def get_weather(self):
-        """Fetch the current weather data using the coordinates."""
-        lat, lon = self.coordinates
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units={self.units}"
-        return self.fetch_data(weather_url)
-
-    def get_forecast(self):
-        """Fetch the forecast weather data using the coordinates."""
-        lat, lon = self.coordinates
-        forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={API_KEY}&units={self.units}"
-        return self.fetch_data(forecast_url)
-
-def format_weather_data(data):
-    """Format the weather data for clean display."""
-    description = data['weather'][0]['description']
-    temp = round(data['main']['temp'])
-    feels_like = round(data['main']['feels_like'])
-    humidity = round(data['main']['humidity'])
-    wind_speed = round(data['wind']['speed'])
-    
-    return f"is {temp}°F and {description}. It feels like {feels_like}°F with a humidity of {humidity}% and a wind speed of {wind_speed} mph."
-
-def time_until_event(event_time):
-    now = datetime.now()
-    event_datetime = datetime.fromtimestamp(event_time)
-    time_diff = event_datetime - now
-    minutes_until = round(time_diff.total_seconds() / 60)
-    hours_until = minutes_until // 60
-    minutes_remaining = minutes_until % 60
-    return hours_until, minutes_remaining, event_datetime.strftime("%I:%M %p")
-
-def detect_rain(data):
-    """Detect rain in the past three days and estimate if the grass is wet."""
-    rain_total = 0
-    recent_rain = 0
-    threshold = 30  # mm of rain threshold to consider the grass wet
-    if 'list' in data:
-        for entry in data['list']:
-            if 'rain' in entry:
-                rain_3h = entry['rain'].get('3h', 0)
-                rain_total += rain_3h
-                if (datetime.now() - datetime.strptime(entry['dt_txt'], "%Y-%m-%d %H:%M:%S")).days <= 1:
-                    recent_rain += rain_3h
-
-    return f"The grass is likely {'wet' if rain_total > threshold and recent_rain > 0 else 'dry'}."
-
-def weather_call(city="High Point"):
-    """Fetch and return a consolidated weather report."""
-    weather_data = WeatherData(city)
-    try:
-        current_weather = weather_data.get_weather()
-        forecast_weather = weather_data.get_forecast()
-
-        report = format_weather_data(current_weather)
-        
-        sunrise = current_weather['sys']['sunrise']
-        sunset = current_weather['sys']['sunset']
-        
-        hours_until_sunrise, minutes_until_sunrise, sunrise_time = time_until_event(sunrise)
-        hours_until_sunset, minutes_until_sunset, sunset_time = time_until_event(sunset)
-        
-        if hours_until_sunrise < 0:
-            hours_until_sunrise += 24  # Add 24 hours if the event is on the next day
-        if hours_until_sunset < 0:
-            hours_until_sunset += 24  # Add 24 hours if the event is on the next day
-        
-        next_event = "sunrise" if hours_until_sunrise < hours_until_sunset else "sunset"
-        hours_until_event_time = min(hours_until_sunrise, hours_until_sunset)
-        minutes_until_event_time = minutes_until_sunrise if next_event == "sunrise" else minutes_until_sunset
-        event_time_str = sunrise_time if next_event == "sunrise" else sunset_time
-        
-        rain_analysis = detect_rain(forecast_weather)
-        
-        if hours_until_event_time == 0:
-            event_str = f"You can catch the next {next_event} at {event_time_str} in {minutes_until_event_time} minutes."
-        else:
-            event_str = f"You can catch the next {next_event} at {event_time_str} in {hours_until_event_time} hours and {minutes_until_event_time} minutes."
-        
-        return f"The current weather in {city}:\n{report}\n{event_str}\n{rain_analysis}"
-
-    except Exception as e:
-        return f"Sorry, I couldn't fetch the weather information for {city}. Error: {e}"
+# weather_module.py
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from forecast_analytics import ForecastArrays, grass_is_wet
+
+# Load the API key from the .env file
+load_dotenv()
+API_KEY = os.getenv("WEATHER_API_KEY")
+API_BASE = os.getenv("OPENWEATHER_API_URL", "https://api.openweathermap.org")
+
+if not API_KEY:
+    raise ValueError("API key is missing. Please check your .env file.")
+
+# OpenWeather refreshes current conditions about every 10 minutes and the
+# 3-hourly forecast a few times a day, so cached payloads live that long.
+CURRENT_TTL = 600
+FORECAST_TTL = 3600
+COORDINATES_FILE = 'weather_coordinates.json'
+# The background refresher rebuilds the spoken report this often
+REFRESH_INTERVAL = 300
+
+logger = logging.getLogger(__name__)
+
+# Shared connection pool and worker threads for all weather requests
+session = requests.Session()
+executor = ThreadPoolExecutor(max_workers=2)
+
+response_cache = {}  # (kind, lat, lon, units) -> (expires_at, payload)
+cache_lock = threading.Lock()
+
+def load_coordinates():
+    try:
+        with open(COORDINATES_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+coordinates_cache = load_coordinates()  # lower-cased city name -> [lat, lon]
+
+def save_coordinates():
+    tmp_path = f"{COORDINATES_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(coordinates_cache, f)
+    os.replace(tmp_path, COORDINATES_FILE)
+
+class WeatherData:
+    def __init__(self, city_name="High Point", units='imperial'):
+        self.city_name = city_name
+        self.units = units
+        self.coordinates = self.get_coordinates()
+
+    def get_coordinates(self):
+        """Return the city's coordinates, asking the Geocoder API only the first time."""
+        key = self.city_name.strip().lower()
+        if key in coordinates_cache:
+            return tuple(coordinates_cache[key])
+        geocode_url = f"{API_BASE}/geo/1.0/direct?q={self.city_name}&limit=1&appid={API_KEY}"
+        response = session.get(geocode_url)
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            raise ValueError(f"City not found: {self.city_name}")
+        coordinates_cache[key] = [data[0]['lat'], data[0]['lon']]
+        save_coordinates()
+        return data[0]['lat'], data[0]['lon']
+
+    def fetch_data(self, url):
+        """Generic function to fetch data from the given URL."""
+        response = session.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_cached(self, kind, url, ttl):
+        """Fetch the URL unless a payload of this kind for these coordinates is still fresh."""
+        key = (kind, *self.coordinates, self.units)
+        with cache_lock:
+            cached = response_cache.get(key)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        payload = self.fetch_data(url)
+        with cache_lock:
+            response_cache[key] = (time.time() + ttl, payload)
+        return payload
+
+    def get_weather(self):
+        """Fetch the current weather data using the coordinates."""
+        lat, lon = self.coordinates
+        weather_url = f"{API_BASE}/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units={self.units}"
+        return self.fetch_cached('weather', weather_url, CURRENT_TTL)
+
+    def get_forecast(self):
+        """Fetch the forecast weather data using the coordinates."""
+        lat, lon = self.coordinates
+        forecast_url = f"{API_BASE}/data/2.5/forecast?lat={lat}&lon={lon}&appid={API_KEY}&units={self.units}"
+        return self.fetch_cached('forecast', forecast_url, FORECAST_TTL)
+
+    def get_weather_and_forecast(self):
+        """Fetch current weather and forecast concurrently."""
+        forecast_future = executor.submit(self.get_forecast)
+        current_weather = self.get_weather()
+        return current_weather, forecast_future.result()
+
+def format_weather_data(data):
+    """Format the weather data for clean display."""
+    description = data['weather'][0]['description']
+    temp = round(data['main']['temp'])
+    feels_like = round(data['main']['feels_like'])
+    humidity = round(data['main']['humidity'])
+    wind_speed = round(data['wind']['speed'])
+    
+    return f"is {temp}°F and {description}. It feels like {feels_like}°F with a humidity of {humidity}% and a wind speed of {wind_speed} mph."
+
+def time_until_event(event_time):
+    now = datetime.now()
+    event_datetime = datetime.fromtimestamp(event_time)
+    time_diff = event_datetime - now
+    minutes_until = round(time_diff.total_seconds() / 60)
+    hours_until = minutes_until // 60
+    minutes_remaining = minutes_until % 60
+    return hours_until, minutes_remaining, event_datetime.strftime("%I:%M %p")
+
+def detect_rain(data):
+    """Detect rain in the past three days and estimate if the grass is wet."""
+    wet = grass_is_wet(ForecastArrays(data))
+    return f"The grass is likely {'wet' if wet else 'dry'}."
+
+def sun_event(sunrise, sunset):
+    """The countdown to the next sunrise or sunset, worded for the current time."""
+    hours_until_sunrise, minutes_until_sunrise, sunrise_time = time_until_event(sunrise)
+    hours_until_sunset, minutes_until_sunset, sunset_time = time_until_event(sunset)
+    
+    if hours_until_sunrise < 0:
+        hours_until_sunrise += 24  # Add 24 hours if the event is on the next day
+    if hours_until_sunset < 0:
+        hours_until_sunset += 24  # Add 24 hours if the event is on the next day
+    
+    next_event = "sunrise" if hours_until_sunrise < hours_until_sunset else "sunset"
+    hours_until_event_time = min(hours_until_sunrise, hours_until_sunset)
+    minutes_until_event_time = minutes_until_sunrise if next_event == "sunrise" else minutes_until_sunset
+    event_time_str = sunrise_time if next_event == "sunrise" else sunset_time
+    
+    if hours_until_event_time == 0:
+        return f"You can catch the next {next_event} at {event_time_str} in {minutes_until_event_time} minutes."
+    return f"You can catch the next {next_event} at {event_time_str} in {hours_until_event_time} hours and {minutes_until_event_time} minutes."
+
+def build_conditions(city="High Point"):
+    """
+    Fetch the data for a city and compose the conditions and rain part of the
+    report, which only changes with the data. Returns (text, (sunrise, sunset));
+    raises on failure.
+    """
+    weather_data = WeatherData(city)
+    current_weather, forecast_weather = weather_data.get_weather_and_forecast()
+
+    report = format_weather_data(current_weather)
+    rain_analysis = detect_rain(forecast_weather)
+    sun_times = (current_weather['sys']['sunrise'], current_weather['sys']['sunset'])
+    return f"The current weather in {city}:\n{report}\n{rain_analysis}", sun_times
+
+def build_report(city="High Point"):
+    """Fetch the data for a city and compose the spoken report; raises on failure."""
+    conditions, sun_times = build_conditions(city)
+    return f"{conditions}\n{sun_event(*sun_times)}"
+
+def weather_call(city="High Point"):
+    """Fetch and return a consolidated weather report."""
+    try:
+        return build_report(city)
+    except Exception as e:
+        return f"Sorry, I couldn't fetch the weather information for {city}. Error: {e}"
+
+class WeatherRefresher:
+    """
+    Refreshes the report for each configured city on an interval, so a weather
+    request is answered from memory. When given a synthesize callable (such as
+    tts.synthesize_speech) it also keeps the conditions pre-rendered,
+    synthesizing again only when their wording changes. The sunrise/sunset
+    countdown changes every minute, so it is worded when the report is asked for.
+    """
+    def __init__(self, cities=("High Point",), interval=REFRESH_INTERVAL, synthesize=None):
+        self.cities = list(cities)
+        self.interval = interval
+        self.synthesize = synthesize
+        self.reports = {}  # lower-cased city -> (conditions text, audio bytes or None, (sunrise, sunset))
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            for city in self.cities:
+                self.refresh(city)
+            self.stop_event.wait(self.interval)
+
+    def refresh(self, city):
+        key = city.strip().lower()
+        with self.lock:
+            previous = self.reports.get(key)
+        try:
+            text, sun_times = build_conditions(city)
+            if previous is not None and previous[0] == text and previous[1] is not None:
+                audio = previous[1]  # Same words; don't pay for the same synthesis again
+            else:
+                audio = self.synthesize(text) if self.synthesize else None
+        except Exception as e:
+            logger.error(f"Weather refresh failed for {city}: {e}")
+            return
+        with self.lock:
+            self.reports[key] = (text, audio, sun_times)
+
+    def get_report(self, city="High Point"):
+        """
+        Return (conditions text, conditions audio, sun event sentence) for the
+        city, or None if it has not been refreshed yet.
+        """
+        with self.lock:
+            ready = self.reports.get(city.strip().lower())
+        if ready is None:
+            return None
+        text, audio, sun_times = ready
+        return text, audio, sun_event(*sun_times)
@@ -0,0 +1,138 @@
+# answer_cache.py
+"""
+Local semantic cache of LLM answers.
+
+Each prompt is turned into a hashed bag of words and word pairs (stopwords
+dropped, question words kept), L2-normalized, and stored as one row of a
+float32 matrix that lives on disk as a memory-mapped .npy file. A lookup is a
+single matrix-vector product against every stored row; the best match is
+served if its cosine similarity clears the threshold. Only answers from the
+same model are candidates. Prompts, answers, models and usage stats sit next
+to the matrix in a JSON file. When the cache is full the
+least recently used entry is overwritten.
+"""
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from text_resources import STOP_WORDS, word_tokenize
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = 'answer_cache'
+DIMENSIONS = 1024
+CAPACITY = 2000
+# Cosine similarity needed to serve a stored answer
+THRESHOLD = 0.9
+# Log hit rate and latency saved after this many lookups
+REPORT_EVERY = 20
+
+# "Why is the sky blue" and "what is the sky blue" are different questions
+QUESTION_WORDS = frozenset({"what", "why", "how", "when", "where", "who", "whom", "which", "not", "no", "nor"})
+CONTENT_STOP_WORDS = STOP_WORDS - QUESTION_WORDS
+
+
+def embed(text, dimensions=DIMENSIONS):
+    """Hashed unigram and bigram counts, L2-normalized."""
+    words = [w for w in word_tokenize(text.lower()) if w.isalnum() and w not in CONTENT_STOP_WORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature in features:
+        # crc32 rather than hash(), which is randomized per process
+        vector[zlib.crc32(feature.encode('utf-8')) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    def __init__(self, directory=CACHE_DIR, capacity=CAPACITY, dimensions=DIMENSIONS, threshold=THRESHOLD):
+        self.directory = directory
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.vectors_path = os.path.join(directory, 'vectors.npy')
+        self.entries_path = os.path.join(directory, 'entries.json')
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.lock = threading.Lock()
+        self.entries = []  # slot -> {prompt, answer, model, generation_ms, last_used, hits}
+        self.vectors = None
+        self.open()
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            self.vectors = np.load(self.vectors_path, mmap_mode='r+')
+            if self.vectors.shape != (self.capacity, self.dimensions) or len(self.entries) > self.capacity:
+                raise ValueError(f"cache shape {self.vectors.shape} does not match the configuration")
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.entries_path):
+                logger.warning(f"Starting a new answer cache: {e}")
+            self.entries = []
+            self.vectors = np.lib.format.open_memmap(self.vectors_path, mode='w+', dtype=np.float32,
+                                                     shape=(self.capacity, self.dimensions))
+
+    def save_entries(self):
+        temp_path = f"{self.entries_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.entries_path)
+
+    def lookup(self, prompt, model=None):
+        """Return the stored answer from model for the most similar past prompt, or None."""
+        start = time.perf_counter()
+        query = embed(prompt, self.dimensions)
+        with self.lock:
+            answer = None
+            if self.entries and query.any():
+                similarities = self.vectors[:len(self.entries)] @ query
+                same_model = np.array([entry.get('model') == model for entry in self.entries])
+                similarities = np.where(same_model, similarities, -1.0)
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.threshold:
+                    entry = self.entries[slot]
+                    entry['last_used'] = time.time()
+                    entry['hits'] += 1
+                    answer = entry['answer']
+                    self.saved_ms += entry['generation_ms'] - (time.perf_counter() - start) * 1000
+                    logger.info(f"Answer cache hit ({similarities[slot]:.2f}) for: {prompt}")
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if (self.hits + self.misses) % REPORT_EVERY == 0:
+                logger.info(f"Answer cache: {self.report()}")
+        return answer
+
+    def add(self, prompt, answer, generation_ms, model=None):
+        """Store a generated answer, evicting the least recently used entry when full."""
+        vector = embed(prompt, self.dimensions)
+        if not vector.any():
+            return
+        entry = {"prompt": prompt, "answer": answer, "model": model, "generation_ms": round(generation_ms, 1),
+                 "last_used": time.time(), "hits": 0}
+        with self.lock:
+            if len(self.entries) < self.capacity:
+                slot = len(self.entries)
+                self.entries.append(entry)
+            else:
+                slot = min(range(len(self.entries)), key=lambda i: self.entries[i]['last_used'])
+                self.entries[slot] = entry
+            self.vectors[slot] = vector
+            self.vectors.flush()
+            self.save_entries()
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "lookups": lookups,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+        }
@@ -0,0 +1,179 @@
+# atom_async.py
+"""
+Async web server for the Atom UI: one process serves many open connections.
+
+It has the same routes as atom_online, plus /stream and /stream_audio. These
+answer with Server-Sent Events as the turn goes on, so the page can render
+before the turn is over:
+
+    recognized  {"text": ...}           the utterance, as soon as STT is done
+    route       {"intent": ...}         what the router decided
+    token       {"text": ...}           LLM output as it is generated
+    reply       {"text": ...}           each thing Atom says
+    audio       {"text", "url"}         where to fetch that reply's speech
+    done        {"recognized_text": ..., "response_text": ...}
+    error       {"message": ...}
+
+Turns run on worker threads, because the NLU, skills and STT are blocking
+code. The event loop only carries events from those threads to the open
+responses. When the browser goes away mid-turn, the turn's cancelled event
+is set, which stops its LLM generation.
+
+    python atom_async.py
+"""
+import os
+import json
+import uuid
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+import tts_cache
+from Atom import handle_text, handle_audio, prepare_web_mode, audio_urls, WebTurn
+
+logger = logging.getLogger(__name__)
+
+app = cors(Quart(__name__), allow_origin="*")
+
+UPLOAD_FOLDER = 'uploads'
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# Turns handled at once; LLM generations within them are bounded by the scheduler
+TURN_WORKERS = 32
+turn_executor = ThreadPoolExecutor(max_workers=TURN_WORKERS, thread_name_prefix='turn')
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+async def stream_turn(run):
+    """Run run(turn) on a worker thread and yield the turn's events as SSE."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    turn = WebTurn(on_event=lambda event, data: loop.call_soon_threadsafe(events.put_nowait, (event, data)))
+    future = loop.run_in_executor(turn_executor, run, turn)
+    # Resolves on the loop after every event the turn emitted has been queued
+    future.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            yield sse(*item)
+        try:
+            recognized_text, response_text = future.result()
+        except Exception as e:
+            logger.error(f"Error processing turn: {e}")
+            yield sse('error', {'message': 'Error processing input'})
+            return
+        if not recognized_text:
+            yield sse('error', {'message': 'Nothing was recognized'})
+            return
+        yield sse('done', {'recognized_text': recognized_text, 'response_text': response_text})
+    finally:
+        if not future.done():
+            turn.cancelled.set()  # The client went away mid-turn
+            logger.info("Client disconnected; cancelling its turn")
+
+
+def event_stream(run):
+    response = Response(stream_turn(run), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # A research answer can outlast the default response timeout
+    return response
+
+
+async def save_upload():
+    """Save the uploaded recording under a unique name and return its path, or None."""
+    files = await request.files
+    if 'audio' not in files:
+        return None
+    filepath = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}.wav")
+    await files['audio'].save(filepath)
+    return filepath
+
+
+def handle_upload(filepath, turn=None):
+    try:
+        return handle_audio(filepath, turn)
+    finally:
+        os.remove(filepath)
+
+
+def reply_json(run):
+    """Run run(turn) and return the JSON reply, with one speech URL per reply."""
+    turn = WebTurn()
+    recognized_text, response_text = run(turn)
+    return {'recognized_text': recognized_text, 'response_text': response_text,
+            'audio_urls': audio_urls(turn)}
+
+
+@app.route('/stream', methods=['POST'])
+async def stream_text():
+    input_text = (await request.get_json() or {}).get('input_text')
+    if not input_text:
+        return jsonify({'result': 'No text provided'}), 400
+    return event_stream(lambda turn: (input_text, handle_text(input_text, turn)))
+
+
+@app.route('/stream_audio', methods=['POST'])
+async def stream_audio():
+    filepath = await save_upload()
+    if filepath is None:
+        return jsonify({'result': 'No audio file provided'}), 400
+    return event_stream(lambda turn: handle_upload(filepath, turn))
+
+
+@app.route('/process', methods=['POST'])
+async def process_input():
+    input_text = (await request.get_json() or {}).get('input_text')
+    if not input_text:
+        return jsonify({'result': 'No text provided'}), 400
+    try:
+        reply = await asyncio.get_running_loop().run_in_executor(
+            turn_executor, reply_json, lambda turn: (input_text, handle_text(input_text, turn)))
+        return jsonify(reply)
+    except Exception as e:
+        logger.error(f'Error processing input: {e}')
+        return jsonify({'result': 'Error processing input'}), 500
+
+
+@app.route('/upload_audio', methods=['POST'])
+async def upload_audio():
+    filepath = await save_upload()
+    if filepath is None:
+        return jsonify({'result': 'No audio file provided'}), 400
+    try:
+        reply = await asyncio.get_running_loop().run_in_executor(
+            turn_executor, reply_json, lambda turn: handle_upload(filepath, turn))
+        if not reply['recognized_text']:
+            return jsonify({'result': 'Error: Processing audio failed.'}), 500
+        return jsonify(reply)
+    except Exception as e:
+        logger.error(f'Error handling audio: {e}')
+        return jsonify({'result': 'Error processing audio'}), 500
+
+
+@app.route('/audio/<key>', methods=['GET'])
+async def audio(key):
+    # Content-addressed, so browsers cache each clip for good and revalidate by ETag
+    status, headers, body = tts_cache.http_response(key, request.headers.get('If-None-Match'),
+                                                    request.headers.get('Range'))
+    return Response(body, status=status, headers=headers)
+
+
+@app.route('/healthcheck', methods=['GET'])
+async def healthcheck():
+    return jsonify({'status': 'ok'}), 200
+
+
+@app.route('/')
+async def atom():
+    return await app.send_static_file('atom.html')
+
+
+if __name__ == "__main__":
+    prepare_web_mode()
+    app.run(host='0.0.0.0', port=5000)
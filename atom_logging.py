@@ -0,0 +1,175 @@
+# atom_logging.py
+"""
+Logging for the assistant: records are handed to a queue on the calling thread
+and written by a background QueueListener as JSON lines, so file I/O never
+happens on the hot path. The log rotates at midnight or when it reaches
+MAX_BYTES, whichever comes first, and rotated files are gzip-compressed.
+
+read_interactions() streams records back from the current and rotated files.
+"""
+import os
+import re
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from tracing import current_turn
+
+LOG_FILE = 'log_atom_interactions.log'
+MAX_BYTES = 10 * 1024 * 1024
+ROTATE_WHEN = 'midnight'
+BACKUP_COUNT = 14
+
+# Extra attributes passed via logger.info(..., extra={...}) that are kept in the JSON line
+STRUCTURED_FIELDS = ('intent', 'latency_ms', 'outcome', 'utterance')
+
+# Lines written by the old logging.basicConfig format
+LEGACY_LINE = re.compile(r"^(?P<ts>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - (?P<logger>\S+) - (?P<level>\w+) - (?P<msg>.*)$")
+
+_listeners = []
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        turn = getattr(record, 'turn', None)
+        if turn:
+            entry["turn"] = turn
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TurnFilter(logging.Filter):
+    """Stamp records with the turn ID while still on the thread that logged them."""
+    def filter(self, record):
+        record.turn = current_turn()
+        return True
+
+
+class RotatingCompressedFileHandler(TimedRotatingFileHandler):
+    """Rotates on a schedule or on size, gzip-compressing each rotated file."""
+    def __init__(self, filename, max_bytes=MAX_BYTES, when=ROTATE_WHEN, backup_count=BACKUP_COUNT):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        self.namer = self.backup_name
+        self.rotator = self.compress
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is not None:
+            size = self.stream.tell()
+        elif os.path.exists(self.baseFilename):
+            size = os.path.getsize(self.baseFilename)
+        else:
+            return False
+        return size >= self.max_bytes
+
+    @staticmethod
+    def backup_name(default_name):
+        # Several size-based rollovers can happen within one period, so number them
+        counter = 1
+        while os.path.exists(f"{default_name}.{counter:03d}.gz"):
+            counter += 1
+        return f"{default_name}.{counter:03d}.gz"
+
+    @staticmethod
+    def compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def background_handler(handler):
+    """Return a QueueHandler whose records are written by handler on a background thread."""
+    record_queue = queue.SimpleQueue()
+    listener = QueueListener(record_queue, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    queue_handler = QueueHandler(record_queue)
+    queue_handler.addFilter(TurnFilter())
+    return queue_handler
+
+
+def stop_logging():
+    """Flush and stop every background writer."""
+    while _listeners:
+        _listeners.pop().stop()
+
+atexit.register(stop_logging)
+
+
+def setup_logging(path=None, level=logging.INFO, max_bytes=MAX_BYTES, when=ROTATE_WHEN,
+                  backup_count=BACKUP_COUNT):
+    """
+    Route the root logger through the background JSON writer. Safe to call
+    more than once. path defaults to LOG_FILE as it is at call time.
+    """
+    path = path or LOG_FILE
+    root = logging.getLogger()
+    if any(getattr(h, 'atom_log_path', None) == path for h in root.handlers):
+        return
+    file_handler = RotatingCompressedFileHandler(path, max_bytes=max_bytes, when=when, backup_count=backup_count)
+    file_handler.setFormatter(JsonFormatter())
+    queue_handler = background_handler(file_handler)
+    queue_handler.atom_log_path = path
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+
+def log_files(path=LOG_FILE):
+    """Rotated files oldest first, then the current log."""
+    directory, base = os.path.split(os.path.abspath(path))
+    rotated = sorted(name for name in os.listdir(directory) if name.startswith(base + '.') and name.endswith('.gz'))
+    files = [os.path.join(directory, name) for name in rotated]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def parse_line(line):
+    """Return the record dict for a JSON or legacy text log line, or None."""
+    if line.startswith('{'):
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+    match = LEGACY_LINE.match(line.rstrip('\r\n'))
+    return match.groupdict() if match else None
+
+
+def read_interactions(path=LOG_FILE, contains=None, logger_name=None, include_rotated=True):
+    """
+    Stream log records as dicts, oldest first, one line in memory at a time.
+
+    contains is a substring pre-filter applied to the raw line before parsing,
+    which skips the JSON decode for the vast majority of lines.
+    """
+    files = log_files(path) if include_rotated else [path] if os.path.exists(path) else []
+    for file_path in files:
+        opener = gzip.open if file_path.endswith('.gz') else open
+        with opener(file_path, 'rt', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if contains and contains not in line:
+                    continue
+                record = parse_line(line)
+                if record is None:
+                    continue
+                if logger_name and record.get('logger') != logger_name:
+                    continue
+                yield record
@@ -0,0 +1,110 @@
+# benchmark_music_nlu.py
+"""
+Compare per-utterance latency of the original music classification path
+(one predict call per pipeline per utterance) against MusicNLU, both one
+utterance at a time and in batches. Also compares the full spaCy parameter
+model against the NER-only load for load time and per-call latency.
+
+Usage: python benchmark_music_nlu.py [batch_size]
+"""
+import sys
+import time
+import pandas as pd
+from models import get_model, load_spacy_model, load_spacy_ner_model
+from music_nlu import (MusicNLU, EntityExtractor, ACTION_PIPELINE, TARGET_PIPELINE, ACTION_LABEL_ENCODER,
+                       TARGET_LABEL_ENCODER, PARAMETER_MODEL, TARGET_ACTIONS, PARAMETER_ACTIONS)
+
+
+def load_music_utterances(file_path='IntentLabelingDataset.csv'):
+    df = pd.read_csv(file_path)
+    return df.loc[df['Label'] == 'Music', 'Command'].astype(str).tolist()
+
+
+def classify_sequential(utterance, action_pipeline, target_pipeline, action_encoder, target_encoder, nlp):
+    """The per-utterance path SpotifyController.classify_utterance used before MusicNLU."""
+    action = action_encoder.inverse_transform(action_pipeline.predict([utterance]))[0]
+    target = None
+    parameter = None
+    if action in TARGET_ACTIONS:
+        target = target_encoder.inverse_transform(target_pipeline.predict([utterance]))[0]
+    if action in PARAMETER_ACTIONS:
+        parameter = " ".join(ent.text for ent in nlp(utterance).ents)
+    return action, target, parameter
+
+
+def time_per_utterance(func, utterances):
+    start = time.perf_counter()
+    func(utterances)
+    return (time.perf_counter() - start) * 1000 / len(utterances)
+
+
+def timed_load(loader, model_name):
+    start = time.perf_counter()
+    model = loader(model_name)
+    return model, (time.perf_counter() - start) * 1000
+
+
+def benchmark_entities(utterances, batch_size):
+    full_nlp, full_load_ms = timed_load(load_spacy_model, PARAMETER_MODEL)
+    ner_nlp, ner_load_ms = timed_load(load_spacy_ner_model, PARAMETER_MODEL)
+    extractor = EntityExtractor(ner_nlp)
+
+    def per_call(nlp):
+        return lambda texts: [nlp(text).ents for text in texts]
+
+    def piped(texts):
+        return [doc.ents for i in range(0, len(texts), batch_size) for doc in ner_nlp.pipe(texts[i:i + batch_size])]
+
+    def memoized(texts):
+        return [extractor.extract(text) for text in texts]
+
+    memoized(utterances)  # Fill the memo so the timed pass measures repeat utterances
+    print(f"spaCy components, full: {full_nlp.pipe_names}, NER-only: {ner_nlp.pipe_names}")
+    print(f"spaCy load, full pipeline: {full_load_ms:.1f} ms, NER-only: {ner_load_ms:.1f} ms")
+    print(f"spaCy full pipeline:      {time_per_utterance(per_call(full_nlp), utterances):.3f} ms/utterance")
+    print(f"spaCy NER-only:           {time_per_utterance(per_call(ner_nlp), utterances):.3f} ms/utterance")
+    print(f"spaCy NER-only, nlp.pipe: {time_per_utterance(piped, utterances):.3f} ms/utterance")
+    print(f"spaCy NER-only, memo hit: {time_per_utterance(memoized, utterances):.3f} ms/utterance")
+
+
+def main(batch_size=64):
+    utterances = load_music_utterances()
+    action_pipeline = get_model(ACTION_PIPELINE)
+    target_pipeline = get_model(TARGET_PIPELINE)
+    action_encoder = get_model(ACTION_LABEL_ENCODER)
+    target_encoder = get_model(TARGET_LABEL_ENCODER)
+    nlp = get_model(PARAMETER_MODEL)
+    nlu = MusicNLU(action_pipeline, target_pipeline, action_encoder, target_encoder, nlp)
+
+    def sequential(texts):
+        return [classify_sequential(text, action_pipeline, target_pipeline, action_encoder, target_encoder, nlp)
+                for text in texts]
+
+    # Each MusicNLU run starts with an empty entity memo, so it times the NER model rather than
+    # memo hits left by earlier runs; memo hits are timed on their own in benchmark_entities
+    def single(texts):
+        nlu.entities.clear()
+        return [nlu.classify(text) for text in texts]
+
+    def batched(texts):
+        nlu.entities.clear()
+        results = []
+        for i in range(0, len(texts), batch_size):
+            results.extend(nlu.classify_batch(texts[i:i + batch_size]))
+        return results
+
+    # Warm up caches and lazy initialisation before timing
+    sequential(utterances[:5])
+    batched(utterances[:5])
+
+    mismatches = sum(a != b for a, b in zip(sequential(utterances), batched(utterances)))
+    print(f"Music utterances: {len(utterances)} (shared featurizer: {nlu.shared_features})")
+    print(f"Predictions differing from the original path: {mismatches}")
+    print(f"Original pipelines:       {time_per_utterance(sequential, utterances):.3f} ms/utterance")
+    print(f"MusicNLU, one at a time:  {time_per_utterance(single, utterances):.3f} ms/utterance")
+    print(f"MusicNLU, batch of {batch_size}:   {time_per_utterance(batched, utterances):.3f} ms/utterance")
+    benchmark_entities(utterances, batch_size)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -0,0 +1,42 @@
+# benchmark_nlu.py
+"""
+Throughput of the salutation and intent classifiers through nlu_batch at
+batch sizes 1, 32 and 1024, on the utterances from both CSV datasets.
+
+Usage: python benchmark_nlu.py [n_jobs]
+"""
+import sys
+import time
+import pandas as pd
+from nlu_batch import classify_batch, load_classifier, CLASSIFIERS
+
+BATCH_SIZES = (1, 32, 1024)
+
+
+def load_texts():
+    intents = pd.read_csv('IntentLabelingDataset.csv')['Command'].dropna().astype(str).tolist()
+    salutations = pd.read_csv('SalutationDatabase.csv')['Utterance'].dropna().astype(str).tolist()
+    return intents + salutations
+
+
+def utterances_per_second(role, texts, batch_size, n_jobs=1):
+    start = time.perf_counter()
+    classify_batch(role, texts, chunk_size=batch_size, n_jobs=n_jobs)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main(n_jobs=1):
+    texts = load_texts()
+    print(f"{len(texts)} utterances from IntentLabelingDataset.csv and SalutationDatabase.csv")
+    for role in CLASSIFIERS:
+        load_classifier(role)  # Exclude model loading from the timings
+        for batch_size in BATCH_SIZES:
+            rate = utterances_per_second(role, texts, batch_size)
+            print(f"{role:<12} batch {batch_size:>5}: {rate:>10.0f} utterances/sec")
+        if n_jobs > 1:
+            rate = utterances_per_second(role, texts, BATCH_SIZES[-1], n_jobs)
+            print(f"{role:<12} batch {BATCH_SIZES[-1]:>5} x {n_jobs} processes: {rate:>10.0f} utterances/sec")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
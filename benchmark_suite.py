@@ -0,0 +1,240 @@
+# benchmark_suite.py
+"""
+End-to-end offline benchmark: replays utterances from IntentLabelingDataset.csv
+and SalutationDatabase.csv through check_exit -> intent_finder with every
+external service replaced by a local stand-in (service_stubs.StubServer for
+Spotify, Govee, OpenWeather and Ollama; in-process speech stand-ins that
+synthesize through the stub server).
+
+Reports turns/sec, per-stage p50/p95/p99 (from the tracing spans, so HTTP and
+TTS time is broken out too) and peak memory, and writes the results as JSON so
+runs from different commits can be compared:
+
+    python benchmark_suite.py --limit 500 --output bench_results.json
+    python benchmark_suite.py --compare bench_results.json
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from collections import Counter
+
+import pandas as pd
+import requests
+
+import skills
+import atom_logging
+import tracing
+from router import router
+from service_stubs import StubServer
+
+FOLLOW_UP_UTTERANCE = "Goodbye"
+
+
+class StubSpeechToText:
+    """Answers every listen() inside a skill with a closing phrase."""
+    def short_speak(self):
+        return FOLLOW_UP_UTTERANCE
+
+    def long_speak(self):
+        return FOLLOW_UP_UTTERANCE
+
+
+class StubTextToSpeech:
+    """Synthesizes through the stub server's speech endpoint and skips playback."""
+    base_url = None
+
+    def __init__(self, project_id=None, suffix=None):
+        self.session = requests.Session()
+        self.spoken = 0
+
+    def synthesize_speech(self, text):
+        response = self.session.post(f"{self.base_url}/speech/synthesize", json={"text": text})
+        response.raise_for_status()
+        return response.content
+
+    def play_audio(self, audio_content):
+        pass
+
+    def speak(self, text):
+        self.spoken += 1
+        with tracing.span('tts_synthesis', chars=len(text)):
+            audio_content = self.synthesize_speech(text)
+        with tracing.span('tts_playback'):
+            self.play_audio(audio_content)
+
+
+class StubWakeWordDetector:
+    def start(self):
+        pass
+
+    def wait_for_wake_word(self):
+        pass
+
+
+def install_speech_stand_ins(stub_url):
+    """Register STT, TTS and picovoice stand-ins before Atom imports the real SDK modules."""
+    StubTextToSpeech.base_url = stub_url
+    stt_module = types.ModuleType('STT')
+    stt_module.stt = StubSpeechToText()
+    tts_module = types.ModuleType('TTS')
+    tts_module.tts = StubTextToSpeech
+    picovoice_module = types.ModuleType('picovoice')
+    picovoice_module.WakeWordDetector = StubWakeWordDetector
+    sys.modules.update({'STT': stt_module, 'TTS': tts_module, 'picovoice': picovoice_module})
+
+
+def point_services_at(stub_url):
+    os.environ.update({
+        "GOVEE_API_URL": stub_url,
+        "GOVEE_API_KEY": "benchmark",
+        "GOVEE_LAN": "0",
+        "OPENWEATHER_API_URL": stub_url,
+        "WEATHER_API_KEY": "benchmark",
+        "OLLAMA_URL": stub_url,
+    })
+
+
+def load_corpus(limit=None, seed=0):
+    intents = pd.read_csv('IntentLabelingDataset.csv')['Command'].dropna().astype(str).tolist()
+    salutations = pd.read_csv('SalutationDatabase.csv')['Utterance'].dropna().astype(str).tolist()
+    corpus = intents + salutations
+    random.Random(seed).shuffle(corpus)
+    return corpus[:limit] if limit else corpus
+
+
+def replay(atom, corpus):
+    intents = Counter()
+    for utterance in corpus:
+        tracing.new_turn()
+        with tracing.span('turn'):
+            with tracing.span('check_exit'):
+                intent = atom.check_exit(utterance)
+            intents[intent] += 1
+            if intent not in ("Blank", "Exit"):
+                with tracing.span('intent_finder', intent=intent):
+                    atom.intent_finder(intent, utterance)
+    return intents
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(limit=None, seed=0, memory_turns=200, latency=None):
+    workdir = tempfile.mkdtemp(prefix='atom_bench_')
+    trace_path = os.path.join(workdir, 'trace.log')
+    server = StubServer(latency=latency).start()
+    point_services_at(server.url)
+    install_speech_stand_ins(server.url)
+    # Atom calls setup_logging() on import; point the default at the benchmark's log first
+    atom_logging.LOG_FILE = os.path.join(workdir, 'interactions.log')
+    atom_logging.setup_logging()
+
+    tracemalloc.start()
+    import Atom
+    import spotipy
+    import SpotifyController
+    Atom.load_models(Atom.essential_models)
+    controller = SpotifyController.get_controller()
+    controller.sp = spotipy.Spotify(auth="benchmark")
+    controller.sp.prefix = f"{server.url}/v1/"
+    controller.search_cache = SpotifyController.SearchCache(path=os.path.join(workdir, 'search_cache.json'))
+    # Stub answers must never reach the real answer cache, and each run measures the LLM stage afresh
+    skills.SKILLS['ScientificResearch'].resource = Atom.research_session(os.path.join(workdir, 'answer_cache'))
+    _, load_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    corpus = load_corpus(limit, seed)
+    replay(Atom, corpus[:5])  # Warm-up: first-call imports and lazy initialisation
+
+    tracing.enable_tracing(trace_path)
+    tracing.install_http_tracing()
+    server.requests.clear()
+    start = time.perf_counter()
+    intents = replay(Atom, corpus)
+    elapsed = time.perf_counter() - start
+    requests_by_service = dict(server.requests)
+
+    tracemalloc.start()
+    replay(Atom, corpus[:memory_turns])
+    _, replay_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    atom_logging.stop_logging()  # Flush the trace writer before reading it back
+    server.stop()
+
+    return {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "turns": len(corpus),
+        "seconds": round(elapsed, 3),
+        "turns_per_sec": round(len(corpus) / elapsed, 2),
+        "stages_ms": tracing.summarize(trace_path),
+        "intents": dict(intents),
+        "requests": requests_by_service,
+        "cascade": router.report(),
+        "memory_mb": {
+            "model_load_peak": round(load_peak / 2**20, 1),
+            "replay_peak": round(replay_peak / 2**20, 1),
+        },
+    }
+
+
+def print_results(results, baseline=None):
+    print(f"Commit {results['commit']}: {results['turns']} turns in {results['seconds']} s "
+          f"({results['turns_per_sec']} turns/sec)")
+    if baseline:
+        change = results['turns_per_sec'] / baseline['turns_per_sec'] - 1
+        print(f"  vs {baseline['commit']}: {baseline['turns_per_sec']} turns/sec ({change:+.1%})")
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'p50 change':>14}")
+    for stage, stats in sorted(results['stages_ms'].items(), key=lambda item: -item[1]['p50']):
+        delta = ""
+        old = (baseline or {}).get('stages_ms', {}).get(stage)
+        if old and old['p50']:
+            delta = f"{stats['p50'] / old['p50'] - 1:+.1%}"
+        print(f"{stage:<16}{stats['count']:>8}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{delta:>14}")
+    print(f"Memory: model load peak {results['memory_mb']['model_load_peak']} MB, "
+          f"replay peak {results['memory_mb']['replay_peak']} MB")
+    print(f"Stub requests: {results['requests']}")
+    for stage, stats in results.get('cascade', {}).items():
+        tiers = ", ".join(f"{tier} {tier_stats['share']:.1%} ({tier_stats['mean_ms']} ms)"
+                          for tier, tier_stats in stats['tiers'].items())
+        print(f"Cascade {stage}: {tiers}; saved {stats['saved_ms']} ms over {stats['turns']} turns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=None, help="replay only the first N shuffled utterances")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json', help="where to save this run's JSON")
+    parser.add_argument('--compare', default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument('--service-latency', type=float, default=0.0,
+                        help="artificial latency in seconds added to every stub service")
+    args = parser.parse_args()
+
+    latency = {service: args.service_latency for service in ("spotify", "govee", "openweather", "ollama", "speech")}
+    results = run(limit=args.limit, seed=args.seed, latency=latency)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
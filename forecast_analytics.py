@@ -0,0 +1,116 @@
+# forecast_analytics.py
+"""
+Vectorized analysis of OpenWeather 5 day / 3 hour forecasts.
+
+A forecast payload is converted to NumPy arrays once; rain windows, daily highs
+and lows and the next rain time are then computed with array operations rather
+than a Python loop over the 40 entries.
+"""
+import time
+import numpy as np
+from datetime import datetime, timezone, timedelta
+
+STEP_SECONDS = 3 * 3600
+GRASS_WET_THRESHOLD = 30  # mm of rain to consider the grass wet
+
+
+class ForecastArrays:
+    def __init__(self, data):
+        entries = data.get('list', [])
+        count = len(entries)
+        self.timezone = data.get('city', {}).get('timezone', 0)  # seconds east of UTC
+        self.timestamps = np.fromiter((e['dt'] for e in entries), dtype=np.int64, count=count)
+        self.rain = np.fromiter((e.get('rain', {}).get('3h', 0.0) for e in entries), dtype=np.float64, count=count)
+        self.temp = np.fromiter((e['main']['temp'] for e in entries), dtype=np.float64, count=count)
+        self.wind = np.fromiter((e.get('wind', {}).get('speed', 0.0) for e in entries), dtype=np.float64, count=count)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def local_days(self):
+        """Day number (days since epoch, city local time) of each entry."""
+        return (self.timestamps + self.timezone) // 86400
+
+
+def rain_windows(forecast, min_rain=0.0):
+    """Return [(start_ts, end_ts, total_mm)] for each run of consecutive rainy steps."""
+    raining = (forecast.rain > min_rain).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], raining, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exclusive
+    cumulative = np.concatenate(([0.0], np.cumsum(forecast.rain)))
+    totals = cumulative[ends] - cumulative[starts]
+    end_times = forecast.timestamps[ends - 1] + STEP_SECONDS
+    return list(zip(forecast.timestamps[starts].tolist(), end_times.tolist(), totals.tolist()))
+
+
+def daily_summary(forecast):
+    """Return one dict per local calendar day with high, low, total rain and peak wind."""
+    if len(forecast) == 0:
+        return []
+    days, inverse = np.unique(forecast.local_days(), return_inverse=True)
+    highs = np.full(len(days), -np.inf)
+    lows = np.full(len(days), np.inf)
+    rain = np.zeros(len(days))
+    wind = np.zeros(len(days))
+    np.maximum.at(highs, inverse, forecast.temp)
+    np.minimum.at(lows, inverse, forecast.temp)
+    np.add.at(rain, inverse, forecast.rain)
+    np.maximum.at(wind, inverse, forecast.wind)
+    return [
+        {"date": (datetime(1970, 1, 1) + timedelta(days=int(day))).date(),
+         "high": highs[i], "low": lows[i], "rain": rain[i], "max_wind": wind[i]}
+        for i, day in enumerate(days)
+    ]
+
+
+def next_rain(forecast, now=None):
+    """Return the start timestamp of the first rainy step that has not ended yet, or None."""
+    now = time.time() if now is None else now
+    upcoming = np.flatnonzero((forecast.rain > 0) & (forecast.timestamps >= now - STEP_SECONDS))
+    return int(forecast.timestamps[upcoming[0]]) if len(upcoming) else None
+
+
+def grass_is_wet(forecast, now=None, threshold=GRASS_WET_THRESHOLD):
+    """Same rule as the original detect_rain: heavy rain overall and some of it recent."""
+    now = time.time() if now is None else now
+    # Floor division matches timedelta.days for past and future entries alike
+    recent = (now - forecast.timestamps) // 86400 <= 1
+    return forecast.rain.sum() > threshold and forecast.rain[recent].sum() > 0
+
+
+def analyze_cities(forecasts, now=None):
+    """
+    Analyze several cities' forecasts at once.
+
+    forecasts maps city name to an OpenWeather forecast payload. Cities are
+    stacked into zero-padded 2-D arrays so totals and next-rain lookups run as
+    single array operations across all of them.
+    """
+    now = time.time() if now is None else now
+    cities = list(forecasts)
+    arrays = [ForecastArrays(forecasts[city]) for city in cities]
+    if not arrays:
+        return {}
+    width = max(len(a) for a in arrays)
+    rain = np.zeros((len(arrays), width))
+    timestamps = np.zeros((len(arrays), width), dtype=np.int64)
+    for row, a in enumerate(arrays):
+        rain[row, :len(a)] = a.rain
+        timestamps[row, :len(a)] = a.timestamps
+
+    rain_totals = rain.sum(axis=1)
+    upcoming = (rain > 0) & (timestamps >= now - STEP_SECONDS)
+    has_rain = upcoming.any(axis=1)
+    next_rain_ts = np.where(has_rain, timestamps[np.arange(len(arrays)), upcoming.argmax(axis=1)], 0)
+
+    return {
+        city: {
+            "rain_total": float(rain_totals[row]),
+            "next_rain": datetime.fromtimestamp(int(next_rain_ts[row]), tz=timezone.utc) if has_rain[row] else None,
+            "grass_wet": bool(grass_is_wet(arrays[row], now)),
+            "rain_windows": rain_windows(arrays[row]),
+            "daily": daily_summary(arrays[row]),
+        }
+        for row, city in enumerate(cities)
+    }
@@ -0,0 +1,185 @@
+# govee_lan.py
+"""
+Local LAN (UDP) transport for Govee lights.
+
+Devices with "LAN Control" enabled in the Govee Home app answer a multicast scan
+on port 4001, accept commands on port 4003 and reply to the sender on port 4002.
+Commands never leave the local network, so they skip the cloud API's latency and
+per-minute rate limits. UDP gives no delivery report, so a command only counts as
+delivered once the device answers a devStatus query sent after it.
+"""
+import json
+import socket
+import threading
+import time
+
+MULTICAST_GROUP = "239.255.255.250"
+SCAN_PORT = 4001
+LISTEN_PORT = 4002
+CONTROL_PORT = 4003
+
+
+class GoveeLAN:
+    def __init__(self, scan_addresses=None, listen_port=LISTEN_PORT, control_port=CONTROL_PORT, timeout=0.5):
+        self.scan_addresses = scan_addresses or [(MULTICAST_GROUP, SCAN_PORT)]
+        self.control_port = control_port
+        self.timeout = timeout
+        self.devices = {}  # device id (upper case) -> {"ip": ..., "sku": ...}
+        self.last_discovery = 0
+        self.lock = threading.Lock()
+
+        # One socket for the life of the process: it sends every command and
+        # receives every scan/status reply.
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        self.sock.bind(("", listen_port))
+
+    def close(self):
+        self.sock.close()
+
+    def _send(self, address, cmd, data):
+        message = {"msg": {"cmd": cmd, "data": data}}
+        self.sock.sendto(json.dumps(message).encode("utf-8"), address)
+
+    def _receive(self, timeout):
+        """Yield (sender ip, cmd, data) for each reply that arrives before the timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.sock.settimeout(remaining)
+            try:
+                payload, (ip, _port) = self.sock.recvfrom(4096)
+            except socket.timeout:
+                return
+            try:
+                msg = json.loads(payload.decode("utf-8"))["msg"]
+            except (ValueError, KeyError, UnicodeDecodeError):
+                continue
+            yield ip, msg.get("cmd"), msg.get("data", {})
+
+    def discover(self, timeout=None):
+        """Scan the network and return a mapping of device id to address."""
+        with self.lock:
+            for address in self.scan_addresses:
+                self._send(address, "scan", {"account_topic": "reserve"})
+            for ip, cmd, data in self._receive(timeout or self.timeout):
+                if cmd == "scan" and data.get("device"):
+                    self.devices[data["device"].upper()] = {"ip": data.get("ip", ip), "sku": data.get("sku")}
+            self.last_discovery = time.monotonic()
+        return dict(self.devices)
+
+    def address_for(self, device_id):
+        device = self.devices.get(device_id.upper())
+        return device["ip"] if device else None
+
+    def forget(self, device_id):
+        """Drop a device that stopped answering, until the next discovery finds it again."""
+        with self.lock:
+            self.devices.pop(device_id.upper(), None)
+
+    def turn(self, ip, on):
+        self._send((ip, self.control_port), "turn", {"value": 1 if on else 0})
+
+    def brightness(self, ip, value):
+        self._send((ip, self.control_port), "brightness", {"value": int(value)})
+
+    def color(self, ip, rgb):
+        self._send((ip, self.control_port), "colorwc", {"color": rgb, "colorTemInKelvin": 0})
+
+    def status(self, ip):
+        """Return the device's devStatus payload, or None if it did not answer in time."""
+        with self.lock:
+            self._send((ip, self.control_port), "devStatus", {})
+            for sender, cmd, data in self._receive(self.timeout):
+                if cmd == "devStatus" and sender == ip:
+                    return data
+        return None
+
+
+class FakeGoveeDevice:
+    """
+    Local stand-in for a LAN-enabled Govee device, for tests and benchmarks.
+
+    Each fake binds its own loopback address (127.0.0.2, 127.0.0.3, ...) so that
+    several can run side by side, and records every command it receives.
+    """
+    def __init__(self, device_id, sku="H6003", host="127.0.0.2", scan_port=SCAN_PORT,
+                 control_port=CONTROL_PORT, reply_port=LISTEN_PORT):
+        self.device_id = device_id
+        self.sku = sku
+        self.host = host
+        self.reply_port = reply_port
+        self.state = {"onOff": 0, "brightness": 100, "color": {"r": 255, "g": 255, "b": 255}, "colorTemInKelvin": 0}
+        self.commands = []
+        self.running = False
+
+        self.scan_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.scan_sock.bind((host, scan_port))
+        self.control_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.control_sock.bind((host, control_port))
+        self.threads = []
+
+    @property
+    def scan_address(self):
+        return self.scan_sock.getsockname()
+
+    @property
+    def control_port(self):
+        return self.control_sock.getsockname()[1]
+
+    def start(self):
+        self.running = True
+        for sock in (self.scan_sock, self.control_sock):
+            sock.settimeout(0.1)
+            thread = threading.Thread(target=self._serve, args=(sock,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+        self.scan_sock.close()
+        self.control_sock.close()
+
+    def _reply(self, ip, cmd, data):
+        message = {"msg": {"cmd": cmd, "data": data}}
+        self.control_sock.sendto(json.dumps(message).encode("utf-8"), (ip, self.reply_port))
+
+    def _serve(self, sock):
+        while self.running:
+            try:
+                payload, (ip, _port) = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            msg = json.loads(payload.decode("utf-8"))["msg"]
+            cmd, data = msg.get("cmd"), msg.get("data", {})
+            self.commands.append((cmd, data))
+            if cmd == "scan":
+                self._reply(ip, "scan", {"ip": self.host, "device": self.device_id, "sku": self.sku})
+            elif cmd == "devStatus":
+                self._reply(ip, "devStatus", dict(self.state))
+            elif cmd == "turn":
+                self.state["onOff"] = data.get("value", 0)
+            elif cmd == "brightness":
+                self.state["brightness"] = data.get("value", 0)
+            elif cmd == "colorwc":
+                self.state["color"] = data.get("color", self.state["color"])
+                self.state["colorTemInKelvin"] = data.get("colorTemInKelvin", 0)
+
+
+# # Example usage against a fake device:
+# if __name__ == "__main__":
+#     fake = FakeGoveeDevice("AA:BB:CC:DD:EE:FF:00:11", scan_port=14001, control_port=14003, reply_port=14002).start()
+#     lan = GoveeLAN(scan_addresses=[fake.scan_address], listen_port=14002, control_port=14003)
+#     print(lan.discover())
+#     lan.turn(fake.host, True)
+#     print(lan.status(fake.host))
+#     fake.stop()
+#     lan.close()
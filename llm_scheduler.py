@@ -0,0 +1,204 @@
+# llm_scheduler.py
+"""
+Shared queue in front of the local LLM.
+
+Every generation is submitted as a job and run by a fixed pool of workers, so
+no more than max_in_flight requests reach Ollama at once however many web
+clients are talking to Atom. Waiting jobs are taken short prompts first:
+a quick interactive turn does not sit behind a long research conversation.
+
+A job submitted while an identical one (same model, same messages) is still
+queued or running is not generated twice; the second caller waits on the first
+job, and is sent the text generated so far before following along with the
+rest. Each caller holds a ticket; when every ticket on a job has been cancelled
+(timeout, or the client went away) the job is dropped from the queue, or, if
+already running, told to stop so the worker can close the connection to Ollama.
+"""
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+RESEARCH = 1
+
+# Generations sent to Ollama at once; more only queue up inside Ollama and slow each other down
+MAX_IN_FLIGHT = int(os.getenv("ATOM_LLM_IN_FLIGHT", "2"))
+# Prompts at or under this many tokens count as interactive when no priority is given
+SHORT_PROMPT_TOKENS = 200
+# How often a waiting caller checks whether it has been cancelled
+POLL_INTERVAL = 0.1
+
+
+class GenerationCancelled(Exception):
+    """The caller stopped waiting for a generation."""
+
+
+class Job:
+    def __init__(self, key, work, priority):
+        self.key = key
+        self.work = work
+        self.priority = priority
+        self.waiters = 1
+        self.started = False
+        self.cancelled = False
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.parts = []  # Text published so far, replayed to late joiners
+        self.listeners = []
+        self.submitted = time.perf_counter()
+
+
+class Ticket:
+    """One caller's claim on a job."""
+    def __init__(self, scheduler, job, on_part=None):
+        self.scheduler = scheduler
+        self.job = job
+        self.on_part = on_part
+        self.released = False
+
+    def wait(self, timeout=None, cancelled=None):
+        """
+        Return the job's result. Gives up, withdrawing from the job, after
+        timeout seconds or as soon as the cancelled event is set.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.job.done.wait(POLL_INTERVAL):
+            if cancelled is not None and cancelled.is_set():
+                self.cancel()
+                raise GenerationCancelled("Client went away")
+            if deadline is not None and time.monotonic() > deadline:
+                self.cancel()
+                raise TimeoutError(f"No answer after {timeout} s")
+        if self.job.error is not None:
+            raise self.job.error
+        return self.job.result
+
+    def cancel(self):
+        if not self.released:
+            self.released = True
+            self.scheduler.release(self.job, self.on_part)
+
+
+class LLMScheduler:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, short_prompt_tokens=SHORT_PROMPT_TOKENS):
+        self.max_in_flight = max_in_flight
+        self.short_prompt_tokens = short_prompt_tokens
+        self.queue = []  # (priority, sequence, job)
+        self.jobs = {}  # key -> unfinished job, for coalescing
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stats = Counter()
+        self.queued_seconds = 0.0
+        self.workers = []
+
+    def start(self):
+        for i in range(self.max_in_flight):
+            worker = threading.Thread(target=self.run, name=f'llm-{i}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, key, work, priority=None, prompt_tokens=None, on_part=None):
+        """
+        Queue work(should_stop, publish) under key and return a Ticket. work
+        should check should_stop() as it goes and give up when it turns true;
+        each piece of text it passes to publish() reaches on_part of every
+        caller waiting on the job.
+        """
+        if priority is None:
+            short = prompt_tokens is not None and prompt_tokens <= self.short_prompt_tokens
+            priority = INTERACTIVE if short else RESEARCH
+        with self.condition:
+            if not self.workers:
+                self.start()
+            job = self.jobs.get(key)
+            if job is not None and not job.cancelled:
+                job.waiters += 1
+                self.stats['coalesced'] += 1
+                if on_part is not None:
+                    for part in job.parts:
+                        on_part(part)
+                    job.listeners.append(on_part)
+                if not job.started and priority < job.priority:
+                    # An interactive caller pulls the shared job forward; the stale entry is skipped
+                    job.priority = priority
+                    heapq.heappush(self.queue, (priority, next(self.sequence), job))
+                    self.condition.notify()
+                return Ticket(self, job, on_part)
+            job = Job(key, work, priority)
+            if on_part is not None:
+                job.listeners.append(on_part)
+            self.jobs[key] = job
+            heapq.heappush(self.queue, (priority, next(self.sequence), job))
+            self.stats['submitted'] += 1
+            self.condition.notify()
+        return Ticket(self, job, on_part)
+
+    def release(self, job, on_part=None):
+        with self.condition:
+            job.waiters -= 1
+            if on_part in job.listeners:
+                job.listeners.remove(on_part)
+            if job.waiters > 0 or job.done.is_set():
+                return
+            job.cancelled = True
+            self.stats['cancelled'] += 1
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+        logger.info(f"LLM job cancelled ({'running' if job.started else 'queued'})")
+
+    def publish(self, job, part):
+        with self.condition:
+            job.parts.append(part)
+            listeners = list(job.listeners)
+        for on_part in listeners:
+            on_part(part)
+
+    def next_job(self):
+        with self.condition:
+            while True:
+                while not self.queue:
+                    self.condition.wait()
+                _, _, job = heapq.heappop(self.queue)
+                if job.started or job.cancelled:
+                    continue
+                job.started = True
+                self.stats['running'] += 1
+                self.queued_seconds += time.perf_counter() - job.submitted
+                return job
+
+    def run(self):
+        while True:
+            job = self.next_job()
+            try:
+                job.result = job.work(lambda: job.cancelled, lambda part: self.publish(job, part))
+            except Exception as e:
+                job.error = e
+            finally:
+                with self.condition:
+                    self.stats['running'] -= 1
+                    self.stats['completed'] += 1
+                    if self.jobs.get(job.key) is job:
+                        del self.jobs[job.key]
+                job.done.set()
+
+    def report(self):
+        with self.condition:
+            started = self.stats['completed'] + self.stats['running']
+            return {
+                'queued': len({id(job) for _, _, job in self.queue if not (job.started or job.cancelled)}),
+                'running': self.stats['running'],
+                'submitted': self.stats['submitted'],
+                'coalesced': self.stats['coalesced'],
+                'cancelled': self.stats['cancelled'],
+                'mean_queue_ms': round(self.queued_seconds * 1000 / started, 1) if started else 0.0,
+            }
+
+
+scheduler = LLMScheduler()
@@ -0,0 +1,140 @@
+# log_replay.py
+"""
+Replay real traffic from log_atom_interactions.log through the current models.
+
+The log is streamed one record at a time (rotated .gz files included) and the
+per-turn lines are joined into turns: "User interaction:" opens a turn and the
+following "Salutation detected:", "Intent detected:" and "Predicted action:"
+lines fill it in. Turns are re-classified in batches, agreement with what was
+logged is tallied into confusion counts, and the utterances are written as
+Command,Label rows ready to review and append to IntentLabelingDataset.csv.
+Memory stays constant however large the log is.
+
+Usage: python log_replay.py [log file] [--output candidates.csv]
+"""
+import csv
+import argparse
+from collections import Counter, OrderedDict
+from atom_logging import read_interactions, LOG_FILE
+from models import get_model
+from music_nlu import ACTION_PIPELINE, ACTION_LABEL_ENCODER
+from nlu_batch import chunked, classify_batch
+from nlu_cache import normalize
+
+BATCH_SIZE = 1024
+# Approximate de-duplication: remember this many recent distinct utterances
+DEDUPE_WINDOW = 100000
+
+TURN_FIELDS = {
+    "Salutation detected: ": "salutation",
+    "Intent detected: ": "intent",
+    "Predicted action: ": "action",
+}
+
+
+def iter_turns(log_path=LOG_FILE):
+    """Yield one dict per logged turn: utterance, ts and whatever was detected for it."""
+    turn = None
+    for record in read_interactions(log_path):
+        message = record.get('msg', '')
+        if message.startswith("User interaction: "):
+            if turn:
+                yield turn
+            turn = {"utterance": message[len("User interaction: "):], "ts": record.get('ts'),
+                    "turn": record.get('turn')}
+            continue
+        if turn is None:
+            continue
+        # JSON logs carry the turn ID; legacy text logs are joined by order alone
+        if turn['turn'] and record.get('turn') and record['turn'] != turn['turn']:
+            continue
+        for prefix, field in TURN_FIELDS.items():
+            if message.startswith(prefix) and field not in turn:
+                turn[field] = message[len(prefix):]
+                break
+    if turn:
+        yield turn
+
+
+def predict_music_actions(utterances):
+    if not utterances:
+        return []
+    pipeline = get_model(ACTION_PIPELINE)
+    encoder = get_model(ACTION_LABEL_ENCODER)
+    return encoder.inverse_transform(pipeline.predict(utterances)).tolist()
+
+
+def load_known_commands(dataset_path='IntentLabelingDataset.csv'):
+    try:
+        with open(dataset_path, 'r', encoding='utf-8', newline='') as f:
+            return {normalize(row['Command']) for row in csv.DictReader(f) if row.get('Command')}
+    except FileNotFoundError:
+        return set()
+
+
+def evaluate(log_path=LOG_FILE, output_path='log_labeled_candidates.csv', batch_size=BATCH_SIZE):
+    """Re-classify logged turns, write candidate rows, and return confusion counts per model."""
+    confusion = {"Salutation": Counter(), "Intent": Counter(), "MusicAction": Counter()}
+    known = load_known_commands()
+    recent = OrderedDict()
+    turns = written = 0
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(["Command", "Label"])
+        for batch in chunked(iter_turns(log_path), batch_size):
+            utterances = [turn['utterance'] for turn in batch]
+            salutations = classify_batch("Salutation", utterances)
+            general = [i for i, salutation in enumerate(salutations) if salutation == "General"]
+            intents = dict(zip(general, classify_batch("Intent", [utterances[i] for i in general])))
+            music = [i for i in general if intents[i] == "Music"]
+            actions = dict(zip(music, predict_music_actions([utterances[i] for i in music])))
+
+            for i, turn in enumerate(batch):
+                turns += 1
+                if 'salutation' in turn:
+                    confusion["Salutation"][(turn['salutation'], salutations[i])] += 1
+                if 'intent' in turn and i in intents:
+                    confusion["Intent"][(turn['intent'], intents[i])] += 1
+                if 'action' in turn and i in actions:
+                    confusion["MusicAction"][(turn['action'], actions[i])] += 1
+
+                if i not in intents:
+                    continue
+                key = normalize(turn['utterance'])
+                if not key or key in known or key in recent:
+                    continue
+                recent[key] = True
+                if len(recent) > DEDUPE_WINDOW:
+                    recent.popitem(last=False)
+                writer.writerow([turn['utterance'], intents[i]])
+                written += 1
+
+    return {"turns": turns, "candidates": written, "confusion": confusion}
+
+
+def print_report(report):
+    print(f"Turns replayed: {report['turns']}, new candidate rows: {report['candidates']}")
+    for model, counts in report['confusion'].items():
+        total = sum(counts.values())
+        if not total:
+            continue
+        agree = sum(count for (logged, predicted), count in counts.items() if logged == predicted)
+        print(f"\n{model}: {agree}/{total} agree with the logged prediction ({agree / total:.1%})")
+        for (logged, predicted), count in counts.most_common():
+            if logged != predicted:
+                print(f"  logged {logged:<20} now {predicted:<20} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged utterances through the current models.")
+    parser.add_argument('log', nargs='?', default=LOG_FILE)
+    parser.add_argument('--output', default='log_labeled_candidates.csv')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    print_report(evaluate(args.log, args.output, args.batch_size))
+    print(f"\nCandidate rows written to {args.output}; review the labels before appending them.")
+
+
+if __name__ == "__main__":
+    main()
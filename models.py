@@ -1,110 +1,478 @@
-import joblib
-import pickle
-import spacy
-
-# Dictionary to cache models
-model_cache = {}
-
-def load_model(model_name):
-    """
-    Load a model based on its file type.
-    """
-    if model_name.endswith('.pkl'):
-        return load_joblib_model(model_name)  # Assume joblib for .pkl
-    elif model_name.endswith('.joblib'):
-        return load_joblib_model(model_name)
-    elif model_name == 'Music_Parameter_Classification':
-        return load_spacy_model(model_name)
-    else:
-        raise ValueError(f"Unknown model type for: {model_name}")
-
-def load_joblib_model(model_name):
-    """
-    Load a joblib model.
-    """
-    #print(f"Loading {model_name} from joblib...")
-    return joblib.load(model_name)
-
-def load_spacy_model(model_name):
-    """
-    Load a Spacy model.
-    """
-    #print(f"Loading Spacy model: {model_name}...")
-    # Make sure to use the correct path for the Spacy model if necessary
-    return spacy.load(model_name)
-
-def cache_model(model_name, model):
-    """
-    Store the model in the cache.
-    """
-    model_cache[model_name] = model
-
-def get_cached_model(model_name):
-    """
-    Retrieve a model from the cache if it exists.
-    """
-    return model_cache.get(model_name)
-
-def get_model(model_name):
-    """
-    Get a model, either from the cache or by loading it if necessary.
-    """
-    model = get_cached_model(model_name)
-    if model is None:
-        model = load_model(model_name)
-        cache_model(model_name, model)
-    return model
-
-
-
-
-############# EXAMPLE for main file logic:############################
-# from models import get_model, cache_model
-
-# # List of essential models to preload
-# essential_models = [
-#     'Music_action_label_encoder.pkl',
-#     'Music_target_label_encoder.pkl',
-#     'Music_GradientBoosting_target_pipeline.pkl',
-#     'Music_GradientBoosting_action_pipeline.pkl',
-#     'Music_Parameter_Classification'  # Spacy model
-# ]
-
-# # Define function to return model list based on key
-# def model_list(key):
-#     if key == 'chem':
-#         models = ['svm_Chem_tfidf_vectorizer.joblib', 'svm_chemistry_classifier.joblib']
-#     elif key == 'music':
-#         models = []  # No additional models needed for music
-#     else:
-#         models = []
-#     return models
-
-# # Function to load and cache models
-# def load_models(model_names):
-#     for model_name in model_names:
-#         model = get_model(model_name)
-#         cache_model(model_name, model)
-#         print(f"Loaded and cached model: {model_name}")
-
-# # Preload essential models
-# load_models(essential_models)
-
-# # Rest of your main application logic
-# if __name__ == "__main__":
-#     print("Essential models preloaded.")
-#     # Continue with your application logic
-
-#     # Set intent and load models accordingly
-#     music = 'music'
-#     chem = 'chem'
-#     intent = music  # Change this to 'chem' if you want to load chemistry models
-
-#     if intent == music:
-#         print("Music intent detected: No additional models need to be loaded.")
-#     elif intent == chem:
-#         additional_models = model_list('chem')
-#         load_models(additional_models)
-#         print("Chemistry models loaded.")
-#     else:
-#         print("Unknown intent.")
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import joblib
+import pickle
+import spacy
+from nlu_cache import file_signature
+
+logger = logging.getLogger(__name__)
+
+# Dictionary to cache models
+model_cache = {}
+
+# Appending this to a spaCy model name loads only what entity recognition needs
+NER_ONLY_SUFFIX = '[ner]'
+
+# Hot reload state: the file signature each cached model was loaded from, the
+# version each swap replaced (for rollback), and a counter bumped on every swap
+# so holders of direct model references know to fetch them again
+model_signatures = {}
+previous_models = {}
+model_generation = 0
+swap_lock = threading.Lock()
+
+# How often (seconds) the watcher stats the model files
+WATCH_INTERVAL = 2.0
+WARM_UP_TEXT = "play some music"
+
+MANIFEST_FILE = 'models_manifest.json'
+
+# Artifact serving each role unless models_manifest.json maps the role elsewhere
+# (a null vectorizer/tfidf role means the classifier is a pipeline over raw text)
+DEFAULT_ROLES = {
+    'salutation': 'Salutation_SVC_model.joblib',
+    'salutation-vectorizer': 'Salutation_vectorizer_Utterance.joblib',
+    'salutation-tfidf': 'Salutation_tfidf_Utterance.joblib',
+    'intent': 'Intent_SVC_model.joblib',
+    'intent-vectorizer': 'Intent_vectorizer_Command.joblib',
+    'intent-tfidf': 'Intent_tfidf_Command.joblib',
+    'music-action': 'Music_GradientBoosting_action_pipeline.pkl',
+    'music-target': 'Music_GradientBoosting_target_pipeline.pkl',
+    'music-action-encoder': 'Music_action_label_encoder.pkl',
+    'music-target-encoder': 'Music_target_label_encoder.pkl',
+    'music-parameter': 'Music_Parameter_Classification' + NER_ONLY_SUFFIX,
+}
+
+def load_model(model_name):
+    """
+    Load a model based on its file type.
+    """
+    if model_name.endswith('.pkl'):
+        return load_joblib_model(model_name)  # Assume joblib for .pkl
+    elif model_name.endswith('.joblib'):
+        return load_joblib_model(model_name)
+    elif model_name.endswith(NER_ONLY_SUFFIX):
+        return load_spacy_ner_model(model_name[:-len(NER_ONLY_SUFFIX)])
+    elif os.path.isdir(model_name):  # A saved spaCy pipeline, e.g. Music_Parameter_Classification
+        return load_spacy_model(model_name)
+    else:
+        raise ValueError(f"Unknown model type for: {model_name}")
+
+def load_joblib_model(model_name):
+    """
+    Load a joblib model.
+    """
+    #print(f"Loading {model_name} from joblib...")
+    return joblib.load(model_name)
+
+def load_spacy_model(model_name):
+    """
+    Load a Spacy model.
+    """
+    #print(f"Loading Spacy model: {model_name}...")
+    # Make sure to use the correct path for the Spacy model if necessary
+    return spacy.load(model_name)
+
+def ner_exclusions(model_name):
+    """
+    List the pipeline components that entity recognition does not depend on.
+    """
+    config = spacy.util.load_config(os.path.join(model_name, 'config.cfg'))
+    pipeline = config['nlp']['pipeline']
+    keep = {'ner'}
+    # A NER that listens to a shared tok2vec/transformer still needs that component
+    tok2vec = config['components'].get('ner', {}).get('model', {}).get('tok2vec', {})
+    if 'Listener' in tok2vec.get('@architectures', ''):
+        upstream = tok2vec.get('upstream', '*')
+        if upstream == '*':
+            keep.update(name for name in pipeline if name in ('tok2vec', 'transformer'))
+        else:
+            keep.add(upstream)
+    return [name for name in pipeline if name not in keep]
+
+def load_spacy_ner_model(model_name):
+    """
+    Load a Spacy model with every component except NER (and its embedding layer) excluded.
+    """
+    return spacy.load(model_name, exclude=ner_exclusions(model_name))
+
+def model_path(model_name):
+    """
+    The file or directory a model is loaded from.
+    """
+    if model_name.endswith(NER_ONLY_SUFFIX):
+        return model_name[:-len(NER_ONLY_SUFFIX)]
+    return model_name
+
+def cache_model(model_name, model, signature=None):
+    """
+    Store the model in the cache.
+    """
+    model_signatures[model_name] = signature or file_signature(model_path(model_name))
+    model_cache[model_name] = model
+
+def get_cached_model(model_name):
+    """
+    Retrieve a model from the cache if it exists.
+    """
+    return model_cache.get(model_name)
+
+def get_model(model_name):
+    """
+    Get a model, either from the cache or by loading it if necessary.
+    """
+    model = get_cached_model(model_name)
+    if model is None:
+        signature = file_signature(model_path(model_name))
+        start = time.perf_counter()
+        model = load_model(model_name)
+        registry.record_load(model_name, (time.perf_counter() - start) * 1000)
+        cache_model(model_name, model, signature)
+    return model
+
+def warm_up(model):
+    """
+    Run one prediction through text models so the first real request is not the slow one.
+    """
+    if hasattr(model, 'pipe'):  # spaCy
+        model(WARM_UP_TEXT)
+    elif hasattr(model, 'steps'):  # sklearn Pipeline over raw text
+        model.predict([WARM_UP_TEXT])
+
+def swap_models(models, signatures=None):
+    """
+    Replace cached models in one step, keeping the replaced versions for rollback.
+    """
+    global model_generation
+    with swap_lock:
+        for model_name in models:
+            previous_models[model_name] = model_cache.get(model_name)
+        model_signatures.update(signatures or {})
+        # A single dict.update, so readers never see half of a group swapped
+        model_cache.update(models)
+        model_generation += 1
+
+def rollback(*model_names):
+    """
+    Swap the previous version of each model back in.
+    """
+    restore = {name: previous_models[name] for name in model_names if previous_models.get(name) is not None}
+    if restore:
+        swap_models(restore)
+        logger.info(f"Rolled back {', '.join(restore)}")
+    return list(restore)
+
+def reload_models(model_names, warm_up_group=None):
+    """
+    Load new versions of the models, warm them up, then swap them in together.
+
+    warm_up_group, if given, is called with the whole group (new versions where
+    reloaded) and should raise if they do not work together.
+    """
+    start = time.perf_counter()
+    signatures = {name: file_signature(model_path(name)) for name in model_names}
+    candidates = {}
+    for name in model_names:
+        load_start = time.perf_counter()
+        candidates[name] = load_model(name)
+        registry.record_load(name, (time.perf_counter() - load_start) * 1000)
+    for model in candidates.values():
+        warm_up(model)
+    if warm_up_group:
+        warm_up_group(candidates)
+    ready = time.perf_counter()
+    swap_models(candidates, signatures)
+    registry.save()
+    logger.info(f"Hot-swapped {', '.join(model_names)}: loaded and warmed in {(ready - start) * 1000:.0f} ms, "
+                f"swapped in {(time.perf_counter() - ready) * 1000:.2f} ms")
+
+class ModelWatcher:
+    """
+    Polls the files behind cached models and hot-swaps new versions in the
+    background. Models that must change together (a classifier and its
+    vectorizer) are watched as one group. A file is only reloaded once its
+    signature has been stable for a full interval, so half-written files are
+    not picked up, and a version that fails to load or warm up is skipped until
+    the file changes again.
+    """
+    def __init__(self, interval=WATCH_INTERVAL, on_swap=None):
+        self.interval = interval
+        self.on_swap = on_swap
+        self.groups = []  # (model names, warm_up_group)
+        self.pending = {}  # model name -> signature seen on the previous poll
+        self.rejected = {}  # model name -> signature that failed to load
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def watch(self, *model_names, warm_up_group=None):
+        self.groups.append((model_names, warm_up_group))
+        return self
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            for model_names, warm_up_group in self.groups:
+                self.check(model_names, warm_up_group)
+
+    def check(self, model_names, warm_up_group=None):
+        changed = []
+        for name in model_names:
+            if name not in model_cache:
+                continue  # Not loaded yet, so the next get_model reads the new file anyway
+            signature = file_signature(model_path(name))
+            if signature is None or signature == model_signatures.get(name) or signature == self.rejected.get(name):
+                self.pending.pop(name, None)
+                continue
+            if self.pending.get(name) == signature:
+                changed.append(name)
+            else:
+                self.pending[name] = signature  # Wait one interval for the write to finish
+        if not changed or any(name in self.pending and name not in changed for name in model_names):
+            return
+        for name in changed:
+            self.pending.pop(name)
+        def check_group(candidates):
+            warm_up_group([candidates.get(name, model_cache.get(name)) for name in model_names])
+        group_check = check_group if warm_up_group else None
+        try:
+            reload_models(changed, group_check)
+        except Exception as e:
+            logger.error(f"Keeping the current {', '.join(changed)}; new version failed to load: {e}")
+            for name in changed:
+                self.rejected[name] = file_signature(model_path(name))
+            return
+        if self.on_swap:
+            self.on_swap()
+
+def content_hash(path):
+    """
+    sha256 of a file, or of every file (with its relative path) in a model directory.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    for file_path in files:
+        if file_path != path:
+            digest.update(os.path.relpath(file_path, path).replace(os.sep, '/').encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """
+    Manifest-driven view of the model artifacts: which artifact serves each
+    role, and for each artifact its version, sha256, size, load time and
+    memory. An artifact is only re-hashed when its mtime or size no longer
+    match the manifest; a changed hash bumps its version.
+    """
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.roles = dict(DEFAULT_ROLES)
+        self.artifacts = {}
+        self.loaded = False
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return self
+            self.loaded = True
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                return self
+            except ValueError as e:
+                logger.error(f"Ignoring unreadable model manifest {self.path}: {e}")
+                return self
+            self.roles.update(manifest.get('roles', {}))
+            self.artifacts = manifest.get('artifacts', {})
+        return self
+
+    def save(self):
+        """
+        Write the manifest if anything changed since it was read.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'roles': self.roles, 'artifacts': self.artifacts}, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+    def resolve(self, role):
+        """
+        The artifact name serving a role, or None if the manifest maps it to null.
+        """
+        self.load()
+        if role not in self.roles:
+            raise KeyError(f"No model registered for role: {role}")
+        return self.roles[role]
+
+    def refresh(self, model_name):
+        """
+        Return the artifact's manifest entry, re-hashing only if the file changed.
+        """
+        self.load()
+        path = model_path(model_name)
+        signature = file_signature(path)
+        with self.lock:
+            entry = self.artifacts.get(model_name, {'version': 0})
+            if signature is None or (entry.get('sha256') and
+                                     (entry.get('mtime_ns'), entry.get('size')) == signature):
+                return entry
+        digest = content_hash(path)
+        with self.lock:
+            entry = self.artifacts.setdefault(model_name, entry)
+            if digest != entry.get('sha256'):
+                entry['version'] = entry.get('version', 0) + 1
+                entry['sha256'] = digest
+            entry['mtime_ns'], entry['size'] = signature
+            self.dirty = True
+        return entry
+
+    def verify(self, model_name):
+        """
+        Re-hash the artifact regardless of mtime and report whether it matches the manifest.
+        """
+        entry = self.load().artifacts.get(model_name, {})
+        return entry.get('sha256') == content_hash(model_path(model_name))
+
+    def record_load(self, model_name, load_ms, memory_mb=None):
+        entry = self.refresh(model_name)
+        with self.lock:
+            entry['load_ms'] = round(load_ms, 1)
+            if memory_mb is not None:
+                entry['memory_mb'] = round(memory_mb, 1)
+            self.dirty = True
+
+    def load_plan(self, roles):
+        """
+        The artifacts for the roles, slowest to load first, each with its manifest entry.
+        """
+        plan = []
+        for role in roles:
+            name = self.resolve(role)
+            if name is None or any(step['name'] == name for step in plan):
+                continue
+            plan.append({'role': role, 'name': name, **self.refresh(name)})
+        plan.sort(key=lambda step: -(step.get('load_ms') or 0))
+        return plan
+
+registry = ModelRegistry()
+
+def resolve_model(role):
+    return registry.resolve(role)
+
+def resolve_models(*roles):
+    return tuple(registry.resolve(role) for role in roles)
+
+def main():
+    """
+    Rebuild the manifest: hash every registered artifact and measure its load time and memory.
+    """
+    import argparse
+    import tracemalloc
+    parser = argparse.ArgumentParser(description="Build or check the model manifest.")
+    parser.add_argument('--verify', action='store_true', help="re-hash every artifact and report mismatches")
+    args = parser.parse_args()
+
+    registry.load()
+    for role, name in sorted(registry.roles.items()):
+        if name is None:
+            continue
+        if file_signature(model_path(name)) is None:
+            print(f"{role:<24} {name}: missing")
+            continue
+        if args.verify:
+            print(f"{role:<24} {name}: {'ok' if registry.verify(name) else 'HASH MISMATCH'}")
+            continue
+        start = time.perf_counter()
+        load_model(name)
+        load_ms = (time.perf_counter() - start) * 1000
+        # Memory is measured on a second load, since tracing slows the load down
+        tracemalloc.start()
+        model = load_model(name)
+        memory_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+        del model
+        registry.record_load(name, load_ms, memory_mb)
+        entry = registry.artifacts[name]
+        print(f"{role:<24} {name}: v{entry['version']} {entry['size'] / 2 ** 20:.1f} MB on disk, "
+              f"{entry['load_ms']:.0f} ms, {entry['memory_mb']:.1f} MB in memory")
+    registry.save()
+
+if __name__ == "__main__":
+    main()
+
+
+
+
+############# EXAMPLE for main file logic:############################
+# from models import get_model, cache_model
+
+# # List of essential models to preload
+# essential_models = [
+#     'Music_action_label_encoder.pkl',
+#     'Music_target_label_encoder.pkl',
+#     'Music_GradientBoosting_target_pipeline.pkl',
+#     'Music_GradientBoosting_action_pipeline.pkl',
+#     'Music_Parameter_Classification'  # Spacy model
+# ]
+
+# # Define function to return model list based on key
+# def model_list(key):
+#     if key == 'chem':
+#         models = ['svm_Chem_tfidf_vectorizer.joblib', 'svm_chemistry_classifier.joblib']
+#     elif key == 'music':
+#         models = []  # No additional models needed for music
+#     else:
+#         models = []
+#     return models
+
+# # Function to load and cache models
+# def load_models(model_names):
+#     for model_name in model_names:
+#         model = get_model(model_name)
+#         cache_model(model_name, model)
+#         print(f"Loaded and cached model: {model_name}")
+
+# # Preload essential models
+# load_models(essential_models)
+
+# # Rest of your main application logic
+# if __name__ == "__main__":
+#     print("Essential models preloaded.")
+#     # Continue with your application logic
+
+#     # Set intent and load models accordingly
+#     music = 'music'
+#     chem = 'chem'
+#     intent = music  # Change this to 'chem' if you want to load chemistry models
+
+#     if intent == music:
+#         print("Music intent detected: No additional models need to be loaded.")
+#     elif intent == chem:
+#         additional_models = model_list('chem')
+#         load_models(additional_models)
+#         print("Chemistry models loaded.")
+#     else:
+#         print("Unknown intent.")
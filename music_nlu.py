@@ -0,0 +1,125 @@
+# music_nlu.py
+"""
+Music command understanding with a single featurization pass.
+
+The action and target classifiers are sklearn pipelines trained on the same
+utterances. MusicNLU splits each into its featurizer and its estimator head,
+and when the two featurizers are identical it vectorizes a batch once and feeds
+the same matrix to both heads.
+"""
+import joblib
+import threading
+from collections import OrderedDict
+from models import get_model, model_path, resolve_model
+
+ACTION_PIPELINE = resolve_model('music-action')
+TARGET_PIPELINE = resolve_model('music-target')
+ACTION_LABEL_ENCODER = resolve_model('music-action-encoder')
+TARGET_LABEL_ENCODER = resolve_model('music-target-encoder')
+PARAMETER_NER_MODEL = resolve_model('music-parameter')
+PARAMETER_MODEL = model_path(PARAMETER_NER_MODEL)
+ENTITY_CACHE_SIZE = 1024
+
+# Only these actions need a target, and only 'play' needs an entity parameter
+TARGET_ACTIONS = ('play', 'volume')
+PARAMETER_ACTIONS = ('play',)
+
+
+def split_pipeline(pipeline):
+    """Return (featurizer, head) for a Pipeline, or (None, model) for a bare estimator."""
+    if hasattr(pipeline, 'steps') and len(pipeline.steps) > 1:
+        return pipeline[:-1], pipeline.steps[-1][1]
+    return None, pipeline
+
+
+def featurize(featurizer, texts):
+    return featurizer.transform(texts) if featurizer is not None else texts
+
+
+def take_rows(features, rows):
+    if isinstance(features, list):
+        return [features[i] for i in rows]
+    return features[rows]
+
+
+class EntityExtractor:
+    """Extracts the play parameter from utterances, memoizing repeated ones."""
+    def __init__(self, nlp, cache_size=ENTITY_CACHE_SIZE):
+        self.nlp = nlp
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()  # Web and skill worker threads share one extractor
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+    def extract(self, text):
+        return self.extract_batch([text])[0]
+
+    def extract_batch(self, texts):
+        results = {}
+        misses = []
+        with self.lock:
+            for text in texts:
+                if text in self.cache:
+                    self.cache.move_to_end(text)
+                    results[text] = self.cache[text]
+                elif text not in results:
+                    results[text] = None
+                    misses.append(text)
+        # The NER model runs outside the lock, so one slow batch does not hold up cache hits
+        parsed = [(text, " ".join(ent.text for ent in doc.ents)) for text, doc in zip(misses, self.nlp.pipe(misses))]
+        with self.lock:
+            for text, parameter in parsed:
+                results[text] = parameter
+                self.cache[text] = parameter
+                self.cache.move_to_end(text)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return [results[text] for text in texts]
+
+
+class MusicNLU:
+    def __init__(self, action_pipeline=None, target_pipeline=None, action_label_encoder=None,
+                 target_label_encoder=None, nlp=None):
+        self.action_features, self.action_head = split_pipeline(action_pipeline or get_model(ACTION_PIPELINE))
+        self.target_features, self.target_head = split_pipeline(target_pipeline or get_model(TARGET_PIPELINE))
+        self.action_label_encoder = action_label_encoder or get_model(ACTION_LABEL_ENCODER)
+        self.target_label_encoder = target_label_encoder or get_model(TARGET_LABEL_ENCODER)
+        self.nlp = nlp or get_model(PARAMETER_NER_MODEL)
+        self.entities = EntityExtractor(self.nlp)
+        # Fitted featurizers hash equal only if vocabulary and weights match exactly
+        self.shared_features = (self.action_features is not None and
+                                joblib.hash(self.action_features) == joblib.hash(self.target_features))
+
+    def classify(self, utterance):
+        """Return (action, target, parameter) for one utterance."""
+        return self.classify_batch([utterance])[0]
+
+    def classify_batch(self, utterances):
+        """Return a list of (action, target, parameter) tuples, one per utterance."""
+        texts = list(utterances)
+        if not texts:
+            return []
+
+        action_x = featurize(self.action_features, texts)
+        actions = self.action_label_encoder.inverse_transform(self.action_head.predict(action_x))
+
+        targets = [None] * len(texts)
+        target_rows = [i for i, action in enumerate(actions) if action in TARGET_ACTIONS]
+        if target_rows:
+            if self.shared_features:
+                target_x = take_rows(action_x, target_rows)
+            else:
+                target_x = featurize(self.target_features, [texts[i] for i in target_rows])
+            predicted = self.target_label_encoder.inverse_transform(self.target_head.predict(target_x))
+            for row, target in zip(target_rows, predicted):
+                targets[row] = target
+
+        parameters = [None] * len(texts)
+        parameter_rows = [i for i, action in enumerate(actions) if action in PARAMETER_ACTIONS]
+        for row, parameter in zip(parameter_rows, self.entities.extract_batch([texts[i] for i in parameter_rows])):
+            parameters[row] = parameter
+
+        return list(zip(actions, targets, parameters))
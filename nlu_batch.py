@@ -0,0 +1,115 @@
+# nlu_batch.py
+"""
+Batch classification for the salutation and intent models.
+
+Texts can be any iterable (a list, a CSV column, a log generator). They are
+vectorized in chunks and each chunk is predicted with a single sparse-matrix
+call; with n_jobs > 1 the chunks are sharded across worker processes.
+"""
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from models import get_model, resolve_models
+
+# (model, vectorizer, transformer) artifacts, as resolved by the model registry
+CLASSIFIERS = {
+    'Salutation': resolve_models('salutation', 'salutation-vectorizer', 'salutation-tfidf'),
+    'Intent': resolve_models('intent', 'intent-vectorizer', 'intent-tfidf'),
+}
+
+# Incrementally trained models written by online_training.py (no TF-IDF step)
+HASHING_VECTORIZER = 'online_hashing_vectorizer.joblib'
+ONLINE_CLASSIFIERS = {
+    'Salutation': ('Salutation_online_model.joblib', HASHING_VECTORIZER, None),
+    'Intent': ('Intent_online_model.joblib', HASHING_VECTORIZER, None),
+}
+
+# Set ATOM_ONLINE_NLU=1 to serve the online models once they have been trained
+online_enabled = os.getenv("ATOM_ONLINE_NLU", "0") == "1"
+
+CHUNK_SIZE = 1024
+
+# Models loaded once per worker process by _init_worker
+_worker_tools = None
+
+
+def classifier_files(role):
+    """The online model files for a role when enabled and trained, else the SVC files."""
+    if online_enabled and os.path.exists(ONLINE_CLASSIFIERS[role][0]):
+        return ONLINE_CLASSIFIERS[role]
+    return CLASSIFIERS[role]
+
+
+def load_classifier(role):
+    """Return (model, vectorizer, transformer) for a role, through the shared model cache."""
+    return tuple(get_model(path) if path else None for path in classifier_files(role))
+
+
+def chunked(texts, size):
+    iterator = iter(texts)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def vectorize(vectorizer, transformer, texts):
+    features = vectorizer.transform(texts) if vectorizer is not None else texts
+    if transformer is not None:
+        features = transformer.transform(features)
+    return features
+
+
+def predict_chunk(model, vectorizer, transformer, texts):
+    """Vectorize a list of texts and predict them with one model call."""
+    return model.predict(vectorize(vectorizer, transformer, texts))
+
+
+def predict_with_confidence(model, vectorizer, transformer, texts):
+    """
+    Return (labels, confidences) for a list of texts. A confidence is the
+    model's probability for its predicted label, or None when the model has no
+    predict_proba.
+    """
+    features = vectorize(vectorizer, transformer, texts)
+    labels = model.predict(features).tolist()
+    try:
+        probabilities = model.predict_proba(features)
+    except AttributeError:  # e.g. SVC trained without probability=True
+        return labels, [None] * len(labels)
+    columns = {label: i for i, label in enumerate(model.classes_)}
+    return labels, [float(row[columns[label]]) for row, label in zip(probabilities, labels)]
+
+
+def _init_worker(role):
+    global _worker_tools
+    _worker_tools = load_classifier(role)
+
+
+def _predict_in_worker(texts):
+    return predict_chunk(*_worker_tools, texts).tolist()
+
+
+def iter_classify(role, texts, chunk_size=CHUNK_SIZE, n_jobs=1):
+    """Yield one prediction per text, lazily, so texts can be an unbounded stream."""
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(role,)) as executor:
+            # Keep only a couple of chunks per worker in flight so memory stays bounded
+            pending = deque()
+            for chunk in chunked(texts, chunk_size):
+                pending.append(executor.submit(_predict_in_worker, chunk))
+                if len(pending) >= n_jobs * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        return
+    tools = load_classifier(role)
+    for chunk in chunked(texts, chunk_size):
+        yield from predict_chunk(*tools, chunk).tolist()
+
+
+def classify_batch(role, texts, chunk_size=CHUNK_SIZE, n_jobs=1):
+    """Return a list with one prediction per text."""
+    return list(iter_classify(role, texts, chunk_size=chunk_size, n_jobs=n_jobs))
@@ -0,0 +1,109 @@
+# nlu_cache.py
+"""
+Utterance-level memo of NLU results.
+
+Spoken commands repeat heavily, so the full parse of an utterance (salutation,
+intent, and for music the action, target and parameter) is stored under a
+normalized form of the text. The cache is bounded, and it empties itself when
+any watched model file changes on disk.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 2048
+# How often (seconds) to stat the watched model files
+CHECK_INTERVAL = 1.0
+# Log the hit rate after this many lookups
+REPORT_EVERY = 100
+
+
+def normalize(utterance):
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return " ".join(re.findall(r"[\w%']+", utterance.lower()))
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or of the newest file inside a model directory."""
+    try:
+        if os.path.isdir(path):
+            stats = [os.stat(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names]
+            return (max((s.st_mtime_ns for s in stats), default=0), sum(s.st_size for s in stats))
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+class NLUCache:
+    def __init__(self, max_size=CACHE_SIZE, check_interval=CHECK_INTERVAL):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.entries = OrderedDict()
+        self.watched = {}  # path -> signature at the time entries were computed
+        self.last_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def watch(self, *paths):
+        """Invalidate the cache whenever any of these model files changes."""
+        with self.lock:
+            for path in paths:
+                self.watched.setdefault(path, file_signature(path))
+
+    def _check_models(self):
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        changed = [path for path, signature in self.watched.items() if file_signature(path) != signature]
+        if changed:
+            for path in changed:
+                self.watched[path] = file_signature(path)
+            logger.info(f"NLU cache invalidated ({len(self.entries)} entries); changed models: {', '.join(changed)}")
+            self.entries.clear()
+
+    def get(self, utterance, field):
+        """Return the cached parse dict if it already holds field, else None."""
+        key = normalize(utterance)
+        with self.lock:
+            self._check_models()
+            entry = self.entries.get(key)
+            if entry is not None and field in entry:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                result = dict(entry)
+            else:
+                self.misses += 1
+                result = None
+            lookups = self.hits + self.misses
+        if lookups % REPORT_EVERY == 0:
+            logger.info(f"NLU cache hit rate: {self.hit_rate():.1%} over {lookups} lookups")
+        return result
+
+    def update(self, utterance, **fields):
+        key = normalize(utterance)
+        with self.lock:
+            entry = self.entries.setdefault(key, {})
+            entry.update(fields)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Shared by Atom.check_exit and SpotifyController.classify_utterance
+nlu_cache = NLUCache()
@@ -1,29 +1,177 @@
-import requests
-
-class OllamaLLM:
-    def __init__(self, base_url='http://localhost:11434/api/generate'):
-        self.base_url = base_url
-
-    def generate_response(self, prompt, model='llama3dolphin-llama3:8b', stream=False): #use llama3 or minstral for other tasks
-        data = {
-            "model": model,
-            "prompt": prompt,
-            "stream": stream
-        }
-        response = requests.post(self.base_url, json=data)
-        if response.status_code == 200:
-            return response.json()['response']
-        else:
-            raise Exception(f"Failed to generate response with status code {response.status_code}: {response.text}")
-
-    def bind(self, stop=None):
-        # Dummy bind method to satisfy the Agent class requirements
-        return self
-
-# Example usage
-# api = OllamaAPI()
-# try:
-#     result = api.generate_response("Tell me about the latest news in technology.")
-#     print(result)
-# except Exception as e:
-#     print(e)
+import os
+import json
+import time
+import requests
+from llm_scheduler import GenerationCancelled
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+
+DEFAULT_MODEL = 'llama3dolphin-llama3:8b'
+# How long Ollama keeps the model loaded after a request
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Conversation carried into each chat request; Ollama's default context is 2048 tokens
+HISTORY_TOKEN_BUDGET = 1500
+REQUEST_TIMEOUT = 120
+# Longest a caller waits for a whole answer, time in the scheduler's queue included
+ANSWER_TIMEOUT = 300
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for English."""
+    return len(text) // 4 + 1
+
+class OllamaSession:
+    """
+    A conversation with one model over /api/chat. The whole history goes with
+    every turn, so Ollama reuses its KV cache for the unchanged prefix instead
+    of starting from scratch; keep_alive keeps the model loaded between turns;
+    and the oldest exchanges are dropped once the history exceeds the budget.
+    With an answer_cache, the opening question of a conversation is answered
+    from the cache when a similar one has been asked before. With a scheduler,
+    generations wait their turn in the shared LLM queue.
+    """
+    def __init__(self, model=DEFAULT_MODEL, base_url=OLLAMA_URL, system_prompt=None,
+                 token_budget=HISTORY_TOKEN_BUDGET, keep_alive=KEEP_ALIVE, timeout=REQUEST_TIMEOUT,
+                 answer_cache=None, scheduler=None, answer_timeout=ANSWER_TIMEOUT):
+        self.model = model
+        self.base_url = base_url
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.answer_cache = answer_cache
+        self.scheduler = scheduler
+        self.answer_timeout = answer_timeout
+        self.messages = []
+
+    def reset(self):
+        self.messages = []
+
+    def fork(self):
+        """A new, empty conversation sharing this one's connection pool, cache and scheduler."""
+        session = OllamaSession(self.model, self.base_url, self.system_prompt, self.token_budget,
+                                self.keep_alive, self.timeout, self.answer_cache, self.scheduler,
+                                self.answer_timeout)
+        session.http = self.http
+        return session
+
+    def preload(self):
+        """Load the model into memory ahead of the first question."""
+        self.http.post(f"{self.base_url}/api/generate", json={"model": self.model, "keep_alive": self.keep_alive},
+                       timeout=self.timeout)
+
+    def history_tokens(self):
+        return sum(estimate_tokens(message["content"]) for message in self.messages)
+
+    def trim(self):
+        """Drop the oldest exchanges until the history fits the budget; the newest message always stays."""
+        while len(self.messages) > 1 and self.history_tokens() > self.token_budget:
+            self.messages.pop(0)
+            if self.messages and self.messages[0]["role"] == "assistant":
+                self.messages.pop(0)  # Never start the history with an orphaned answer
+
+    def stream_chat(self, messages, should_stop=None, on_part=None):
+        """
+        Read the answer to messages as Ollama streams it, passing each piece
+        to on_part. If should_stop() turns true the connection is closed,
+        which ends the generation in Ollama, and GenerationCancelled is raised.
+        """
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        response = self.http.post(f"{self.base_url}/api/chat", json=data, stream=True, timeout=self.timeout)
+        try:
+            if response.status_code != 200:
+                raise Exception(f"Failed to generate response with status code {response.status_code}: {response.text}")
+            parts = []
+            for line in response.iter_lines():
+                if should_stop is not None and should_stop():
+                    raise GenerationCancelled("Generation stopped")
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise Exception(f"Failed to generate response: {chunk['error']}")
+                part = chunk.get("message", {}).get("content", "")
+                if part and on_part is not None:
+                    on_part(part)
+                parts.append(part)
+                if chunk.get("done"):
+                    break
+            return "".join(parts)
+        finally:
+            response.close()
+
+    def ask(self, prompt, cancelled=None, on_part=None):
+        """
+        Answer prompt in this conversation. on_part receives the answer as it
+        is generated; the wait ends early once the cancelled event is set.
+        """
+        # Follow-ups depend on the conversation so far; only opening questions are cached
+        cacheable = self.answer_cache is not None and not self.messages
+        if cacheable:
+            answer = self.answer_cache.lookup(prompt, self.model)
+            if answer is not None:
+                self.messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}]
+                return answer
+        self.messages.append({"role": "user", "content": prompt})
+        self.trim()
+        system = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages = system + self.messages
+
+        def generate(should_stop, publish):
+            start = time.perf_counter()
+            answer = self.stream_chat(messages, should_stop, publish)
+            if cacheable:
+                self.answer_cache.add(prompt, answer, (time.perf_counter() - start) * 1000, self.model)
+            return answer
+
+        try:
+            if self.scheduler is None:
+                answer = generate(lambda: cancelled is not None and cancelled.is_set(), on_part)
+            else:
+                # Identical conversations in flight at the same time share one generation
+                key = (self.model, json.dumps(messages))
+                prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+                ticket = self.scheduler.submit(key, generate, prompt_tokens=prompt_tokens, on_part=on_part)
+                answer = ticket.wait(self.answer_timeout, cancelled)
+        except Exception:
+            self.messages.pop()
+            raise
+        self.messages.append({"role": "assistant", "content": answer})
+        return answer
+
+    # Drop-in for OllamaLLM.generate_response
+    def generate_response(self, prompt):
+        return self.ask(prompt)
+
+class OllamaLLM:
+    def __init__(self, base_url=f'{OLLAMA_URL}/api/generate'):
+        self.base_url = base_url
+
+    def generate_response(self, prompt, model='llama3dolphin-llama3:8b', stream=False): #use llama3 or minstral for other tasks
+        data = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        response = requests.post(self.base_url, json=data, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            return response.json()['response']
+        else:
+            raise Exception(f"Failed to generate response with status code {response.status_code}: {response.text}")
+
+    def bind(self, stop=None):
+        # Dummy bind method to satisfy the Agent class requirements
+        return self
+
+# Example usage
+# api = OllamaAPI()
+# try:
+#     result = api.generate_response("Tell me about the latest news in technology.")
+#     print(result)
+# except Exception as e:
+#     print(e)
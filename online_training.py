@@ -0,0 +1,151 @@
+# online_training.py
+"""
+Incremental training for the salutation and intent classifiers.
+
+SaluteAndIntentTraining.py refits the vocabulary and reruns a grid search, so
+adding a few corrected utterances takes minutes. Here the features come from a
+HashingVectorizer, which has no vocabulary to refit, and the classifier is an
+SGDClassifier updated with partial_fit, so new labeled rows update the model
+in seconds. Updated models are written atomically and swapped into the model
+cache; a running Atom with ATOM_ONLINE_NLU=1 picks them up on the next turn.
+
+    python online_training.py bootstrap                     # BOOTSTRAP_EPOCHS passes over both CSVs
+    python online_training.py learn Intent "dim the lamp" IoT
+"""
+import os
+import csv
+import copy
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+from models import get_model, cache_model
+from nlu_batch import ONLINE_CLASSIFIERS, HASHING_VECTORIZER
+from nlu_cache import nlu_cache
+
+DATASETS = {
+    'Salutation': ('SalutationDatabase.csv', 'Utterance'),
+    'Intent': ('IntentLabelingDataset.csv', 'Command'),
+}
+
+# Passes over the dataset when bootstrapping, and over new rows when learning
+BOOTSTRAP_EPOCHS = 10
+LEARN_EPOCHS = 3
+
+_learn_lock = threading.Lock()
+
+
+def build_vectorizer():
+    return HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False)
+
+
+def build_classifier():
+    # modified_huber keeps predict_proba available for confidence thresholds
+    return SGDClassifier(loss='modified_huber', alpha=1e-5, random_state=42)
+
+
+def save_model(path, model):
+    """Write the model atomically, then swap it into the shared model cache."""
+    temp_path = f"{path}.tmp"
+    dump(model, temp_path)
+    os.replace(temp_path, path)
+    cache_model(path, model)
+
+
+def fit_epochs(classifier, features, labels, epochs, classes=None, seed=42):
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    for _ in range(epochs):
+        order = rng.permutation(len(labels))
+        classifier.partial_fit(features[order], labels[order], classes=classes)
+        classes = None  # Only required on the first call
+    return classifier
+
+
+def bootstrap(role):
+    """Train the online model for a role from its full CSV and report held-out accuracy."""
+    dataset, text_column = DATASETS[role]
+    df = pd.read_csv(dataset).dropna(subset=[text_column, 'Label'])
+    texts, labels = df[text_column].astype(str), df['Label'].astype(str)
+    vectorizer = build_vectorizer()
+    classes = np.unique(labels)
+
+    X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    classifier = fit_epochs(build_classifier(), vectorizer.transform(X_train), y_train, BOOTSTRAP_EPOCHS, classes)
+    print(f"Online {role} accuracy: {accuracy_score(y_test, classifier.predict(vectorizer.transform(X_test)))}")
+
+    # The held-out rows still carry signal, so the saved model sees them too
+    fit_epochs(classifier, vectorizer.transform(X_test), y_test, LEARN_EPOCHS)
+    save_model(HASHING_VECTORIZER, vectorizer)
+    save_model(ONLINE_CLASSIFIERS[role][0], classifier)
+    nlu_cache.clear()
+    return classifier
+
+
+def ends_with_newline(path):
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def append_rows(role, texts, labels):
+    dataset, _ = DATASETS[role]
+    complete = ends_with_newline(dataset)
+    with open(dataset, 'a', encoding='utf-8', newline='') as f:
+        if not complete:
+            f.write('\r\n')  # The last row has no line break; the first new row must not be glued onto it
+        csv.writer(f).writerows(zip(texts, labels))
+
+
+def learn(role, texts, labels, append=True):
+    """
+    Update the online model for a role with new labeled rows and hot-swap it.
+
+    The live model is copied, updated and then swapped in, so concurrent
+    predictions always see a complete model. Labels the model has never seen
+    need a bootstrap, because partial_fit cannot add classes.
+    """
+    model_file = ONLINE_CLASSIFIERS[role][0]
+    with _learn_lock:
+        current = get_model(model_file)
+        unknown = set(labels) - set(current.classes_)
+        if unknown:
+            raise ValueError(f"Unknown {role} labels {sorted(unknown)}; add them to the CSV and bootstrap again")
+        updated = fit_epochs(copy.deepcopy(current), get_model(HASHING_VECTORIZER).transform(texts),
+                             labels, LEARN_EPOCHS)
+        save_model(model_file, updated)
+        nlu_cache.clear()
+        if append:
+            append_rows(role, texts, labels)  # So the next full retrain includes them
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally train the salutation and intent classifiers.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    bootstrap_parser = commands.add_parser('bootstrap', help="train the online models from the CSV datasets")
+    bootstrap_parser.add_argument('roles', nargs='*', default=list(DATASETS))
+    learn_parser = commands.add_parser('learn', help="update a model with one corrected utterance")
+    learn_parser.add_argument('role', choices=list(DATASETS))
+    learn_parser.add_argument('utterance')
+    learn_parser.add_argument('label')
+    learn_parser.add_argument('--no-append', action='store_true', help="do not add the row to the CSV dataset")
+    args = parser.parse_args()
+
+    if args.command == 'bootstrap':
+        for role in args.roles:
+            bootstrap(role)
+    else:
+        learn(args.role, [args.utterance], [args.label], append=not args.no_append)
+        print(f"{args.role} model updated with: {args.utterance} -> {args.label}")
+
+
+if __name__ == "__main__":
+    main()
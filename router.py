@@ -0,0 +1,133 @@
+# router.py
+"""
+Cascade routing: each utterance is resolved by the cheapest tier that is sure.
+
+The "rules" tier matches obvious commands (skip, pause, volume up, turn off
+the lamp, goodbye) with anchored regexes before any model runs. The
+"salutation" tier stops after the salutation model when it is confidently not
+a command. Everything else reaches the "intent" tier. Music commands get the
+same treatment: a rule match skips the action, target and NER models.
+
+The router counts how many turns each tier resolves and how long each tier
+takes, so report() can show the share of turns and the latency saved against
+the full model path.
+"""
+import re
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from nlu_batch import load_classifier, predict_with_confidence
+from nlu_cache import normalize
+
+logger = logging.getLogger(__name__)
+
+# A non-General salutation below this probability does not end the cascade
+SALUTATION_THRESHOLD = 0.6
+# ...and the intent model then overrides it only at or above this probability
+INTENT_THRESHOLD = 0.8
+# Log the tier report after this many routed utterances
+REPORT_EVERY = 100
+
+_MUSIC = {'salutation': 'General', 'intent': 'Music', 'target': None, 'parameter': None}
+# Keeps "turn on my running playlist" and "turn it up" out of the IoT rules
+_NOT_MUSIC = r"(?!(?:it|some)\b)(?!.*\b(?:music|songs?|tracks?|playlist|album|spotify|volume|radio|by)\b)"
+
+# (pattern over the normalized utterance, parse fields); named groups become fields too
+RULES = [
+    (r"(?:good ?bye|bye(?: for now)?|exit|that's all|that is all|i'm done|i am done|signing off|"
+     r"stop listening|go to sleep|good night)", {'salutation': 'Exit'}),
+    (r"(?:skip|next)(?: (?:this|the))?(?: song| track)?(?: please)?", {**_MUSIC, 'action': 'skip'}),
+    (r"(?:pause(?: the)?(?: music| song| track| playback)?|stop(?: the)? (?:music|song|track|playback))(?: please)?",
+     {**_MUSIC, 'action': 'pause'}),
+    (r"(?:turn (?:the )?volume|volume|turn (?:it|the music)) (?P<target>up|down)(?: please)?",
+     {**_MUSIC, 'action': 'volume'}),
+    (r"set (?:the )?volume to (?P<target>\d{1,3})(?: percent|%)?", {**_MUSIC, 'action': 'volume'}),
+    (rf"turn (?:on|off) {_NOT_MUSIC}(?:the )?\w[\w ]*", {'salutation': 'General', 'intent': 'IoT'}),
+    (rf"turn {_NOT_MUSIC}(?:the )?\w[\w ]* (?:on|off)", {'salutation': 'General', 'intent': 'IoT'}),
+    (r"(?:what's|what is|how's|how is) the weather(?: like)?(?: today| outside| right now)?",
+     {'salutation': 'General', 'intent': 'Weather'}),
+]
+COMPILED_RULES = [(re.compile(f"^{pattern}$"), fields) for pattern, fields in RULES]
+
+# The tier each stage falls through to when nothing cheaper resolves the turn
+FULL_TIER = {'nlu': 'intent', 'music': 'models'}
+
+
+def match_rules(utterance):
+    """Return the parse fields for an utterance matching a rule, or None."""
+    text = normalize(utterance)
+    for pattern, fields in COMPILED_RULES:
+        match = pattern.match(text)
+        if match:
+            return {**fields, **match.groupdict()}
+    return None
+
+
+class CascadeRouter:
+    def __init__(self, salutation_threshold=SALUTATION_THRESHOLD, intent_threshold=INTENT_THRESHOLD,
+                 report_every=REPORT_EVERY):
+        self.salutation_threshold = salutation_threshold
+        self.intent_threshold = intent_threshold
+        self.report_every = report_every
+        self.counts = defaultdict(Counter)  # stage -> tier -> turns
+        self.seconds = defaultdict(Counter)  # stage -> tier -> total seconds
+        self.lock = threading.Lock()
+
+    def route(self, utterance):
+        """Return the parse dict (salutation, intent and any rule-resolved music fields) for an utterance."""
+        start = time.perf_counter()
+        parse = match_rules(utterance)
+        if parse is not None:
+            tier = 'rules'
+        else:
+            parse, tier = self.classify(utterance)
+        self.record('nlu', tier, time.perf_counter() - start)
+        parse.setdefault('intent', None)
+        return parse
+
+    def classify(self, utterance):
+        (salutation,), (salutation_confidence,) = predict_with_confidence(*load_classifier('Salutation'), [utterance])
+        confident = salutation_confidence is None or salutation_confidence >= self.salutation_threshold
+        if salutation != "General" and confident:
+            return {'salutation': salutation}, 'salutation'
+
+        (intent,), (intent_confidence,) = predict_with_confidence(*load_classifier('Intent'), [utterance])
+        if salutation != "General":
+            # An unsure non-General salutation only yields to a sure intent
+            if intent_confidence is None or intent_confidence < self.intent_threshold:
+                return {'salutation': salutation}, 'intent'
+            logger.info(f"Salutation {salutation} ({salutation_confidence:.2f}) overridden by "
+                        f"intent {intent} ({intent_confidence:.2f})")
+        return {'salutation': "General", 'intent': intent}, 'intent'
+
+    def record(self, stage, tier, seconds):
+        with self.lock:
+            self.counts[stage][tier] += 1
+            self.seconds[stage][tier] += seconds
+            routed = sum(self.counts['nlu'].values())
+        if stage == 'nlu' and routed % self.report_every == 0:
+            logger.info(f"Cascade report: {self.report()}")
+
+    def report(self):
+        """Per stage: turns, per-tier share and mean ms, and ms saved against the full model path."""
+        with self.lock:
+            report = {}
+            for stage, counts in self.counts.items():
+                total = sum(counts.values())
+                mean_ms = {tier: self.seconds[stage][tier] * 1000 / count for tier, count in counts.items()}
+                full_ms = mean_ms.get(FULL_TIER[stage])
+                saved_ms = None
+                if full_ms is not None:
+                    saved_ms = round(sum(count * (full_ms - mean_ms[tier]) for tier, count in counts.items()
+                                         if tier != FULL_TIER[stage]), 1)
+                report[stage] = {
+                    'turns': total,
+                    'tiers': {tier: {'share': round(count / total, 3), 'mean_ms': round(mean_ms[tier], 2)}
+                              for tier, count in counts.items()},
+                    'saved_ms': saved_ms,
+                }
+            return report
+
+
+router = CascadeRouter()
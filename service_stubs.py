@@ -0,0 +1,145 @@
+# service_stubs.py
+"""
+Local stand-ins for the external services Atom talks to, for offline benchmarks.
+
+StubServer is a threaded HTTP server on localhost that answers the routes
+Atom uses on Spotify, Govee, OpenWeather, Ollama and a speech endpoint with
+recorded-shape fixture payloads. Each service can be given an artificial
+latency, and every request is counted per service.
+"""
+import json
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+NOW = int(time.time())
+
+WEATHER_FIXTURE = {
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds"}],
+    "main": {"temp": 71.6, "feels_like": 71.2, "humidity": 58, "pressure": 1016},
+    "wind": {"speed": 6.9, "deg": 220},
+    "sys": {"sunrise": NOW - 6 * 3600, "sunset": NOW + 5 * 3600},
+    "name": "High Point",
+}
+
+FORECAST_FIXTURE = {
+    "city": {"name": "High Point", "timezone": -14400},
+    "list": [
+        {
+            "dt": NOW + step * 3 * 3600,
+            "main": {"temp": 60 + (step % 8) * 2.5},
+            "wind": {"speed": 4.0 + step % 5},
+            "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(NOW + step * 3 * 3600)),
+            **({"rain": {"3h": 1.8}} if step % 7 in (2, 3) else {}),
+        }
+        for step in range(40)
+    ],
+}
+
+GEOCODE_FIXTURE = [{"name": "High Point", "lat": 35.9557, "lon": -80.0053, "country": "US"}]
+
+SPOTIFY_TRACK = {"uri": "spotify:track:08mG3Y1vljYA6bvDt4Wqkj", "name": "Back In Black"}
+
+SPOTIFY_DEVICES = {"devices": [{"id": "stub-device", "name": "Stub Speaker", "type": "Speaker",
+                                "is_active": True, "volume_percent": 40}]}
+
+GOVEE_STATE = {"code": 200, "data": {"properties": [{"online": True}, {"powerState": "on"}, {"brightness": 60}]}}
+
+LLM_RESPONSE = ("The heat of vaporization is measured by supplying a known amount of heat to the liquid "
+                "at its boiling point and recording the mass that evaporates.")
+
+# 0.1 s of silent 16 kHz mono LINEAR16 audio with a WAV header
+WAV_FIXTURE = (b"RIFF" + (36 + 3200).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little") +
+               (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + (16000).to_bytes(4, "little") +
+               (32000).to_bytes(4, "little") + (2).to_bytes(2, "little") + (16).to_bytes(2, "little") +
+               b"data" + (3200).to_bytes(4, "little") + bytes(3200))
+
+
+def route(method, path):
+    """Return (service, status, body) for a request; body is bytes or a JSON-able object."""
+    if path.startswith("/v1/devices"):
+        if method == "GET" and path.startswith("/v1/devices/state"):
+            return "govee", 200, GOVEE_STATE
+        return "govee", 200, {"code": 200, "message": "Success"}
+    if path.startswith("/geo/"):
+        return "openweather", 200, GEOCODE_FIXTURE
+    if path.startswith("/data/2.5/weather"):
+        return "openweather", 200, WEATHER_FIXTURE
+    if path.startswith("/data/2.5/forecast"):
+        return "openweather", 200, FORECAST_FIXTURE
+    if path.startswith("/api/generate"):
+        return "ollama", 200, {"model": "stub", "response": LLM_RESPONSE, "done": True, "context": [1, 2, 3]}
+    if path.startswith("/api/chat"):
+        return "ollama", 200, {"model": "stub", "message": {"role": "assistant", "content": LLM_RESPONSE}, "done": True}
+    if path.startswith("/v1/search"):
+        return "spotify", 200, {"tracks": {"items": [SPOTIFY_TRACK]}}
+    if path.startswith("/v1/me/player/devices"):
+        return "spotify", 200, SPOTIFY_DEVICES
+    if path.startswith("/v1/me/player"):
+        return "spotify", 204, None
+    if path.startswith("/speech/synthesize"):
+        return "speech", 200, WAV_FIXTURE
+    if path.startswith("/speech/recognize"):
+        return "speech", 200, {"text": ""}
+    return "unknown", 404, {"error": f"No stub for {method} {path}"}
+
+
+class StubServer:
+    def __init__(self, latency=None, host="127.0.0.1", port=0):
+        self.latency = latency or {}  # service -> seconds
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_any(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                service, status, body = route(self.command, urlparse(self.path).path)
+                with stub.lock:
+                    stub.requests[service] += 1
+                delay = stub.latency.get(service, 0)
+                if delay:
+                    time.sleep(delay)
+                if body is None:
+                    payload, content_type = b"", "application/json"
+                elif isinstance(body, bytes):
+                    payload, content_type = body, "audio/wav"
+                else:
+                    payload, content_type = json.dumps(body).encode("utf-8"), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
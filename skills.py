@@ -0,0 +1,116 @@
+# skills.py
+"""
+Skill registry: each intent maps to one handler, looked up in a dict.
+
+Handlers register with the skill decorator and declare what they need:
+
+    @skill("ScientificResearch", "News", setup=OllamaSession, timeout=None)
+    def research(utterance, session):
+        ...
+
+setup builds a long-lived resource once (a client, a controller) that is kept
+resident and passed to every call; warm_up runs once at startup, in the
+background, so the first request does not pay for it. max_concurrent bounds
+how many calls to the skill run at once, and timeout bounds how long the
+caller waits for one.
+"""
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from tracing import span, current_turn, set_turn
+
+logger = logging.getLogger(__name__)
+
+# Intent -> Skill
+SKILLS = {}
+
+# Runs handlers that have a timeout, so the caller can stop waiting for them
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='skill')
+
+
+class Skill:
+    def __init__(self, name, handler, setup=None, warm_up=None, timeout=None, max_concurrent=1):
+        self.name = name
+        self.handler = handler
+        self.setup = setup
+        self.warm_up = warm_up
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.resource = None
+        self.lock = threading.Lock()
+
+    def get_resource(self):
+        """Build the resident resource on first use."""
+        if self.setup is None:
+            return None
+        with self.lock:
+            if self.resource is None:
+                self.resource = self.setup()
+            return self.resource
+
+    def warm(self):
+        resource = self.get_resource()
+        if self.warm_up and self.setup:
+            self.warm_up(resource)
+        elif self.warm_up:
+            self.warm_up()
+
+    def call(self, utterance, turn_id=None):
+        if turn_id is not None:
+            set_turn(turn_id)  # Keep spans and log lines on the caller's turn
+        with span('skill', skill=self.name):
+            if self.setup:
+                return self.handler(utterance, self.get_resource())
+            return self.handler(utterance)
+
+    def run(self, utterance):
+        if not self.slots.acquire(timeout=self.timeout):
+            logger.warning(f"Skill {self.name} is busy; dropped: {utterance}")
+            return None
+        if self.timeout is None:
+            try:
+                return self.call(utterance)
+            finally:
+                self.slots.release()
+        # Context variables (e.g. the web request being answered) follow the call into the worker
+        future = _executor.submit(contextvars.copy_context().run, self.call, utterance, current_turn())
+        # The slot is held until the handler really finishes, even if we stop waiting
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            logger.warning(f"Skill {self.name} timed out after {self.timeout} s for: {utterance}")
+            return None
+
+
+def skill(*intents, setup=None, warm_up=None, timeout=None, max_concurrent=1):
+    """Register the decorated function as the handler for the given intents."""
+    def register(handler):
+        registered = Skill(handler.__name__, handler, setup, warm_up, timeout, max_concurrent)
+        for intent in intents:
+            SKILLS[intent] = registered
+        return handler
+    return register
+
+
+def dispatch(intent, utterance):
+    """Run the skill for an intent. Returns False if no skill handles it."""
+    registered = SKILLS.get(intent)
+    if registered is None:
+        return False
+    registered.run(utterance)
+    return True
+
+
+def warm_up_all():
+    """Build and warm every skill in a background thread; failures are logged, not raised."""
+    def run():
+        for registered in {id(s): s for s in SKILLS.values()}.values():
+            try:
+                registered.warm()
+            except Exception as e:
+                logger.error(f"Warm-up failed for skill {registered.name}: {e}")
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
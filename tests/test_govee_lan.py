@@ -0,0 +1,63 @@
+import pytest
+
+from govee_lan import GoveeLAN, FakeGoveeDevice
+
+DEVICE_ID = "AA:BB:CC:DD:EE:FF:00:11"
+
+
+@pytest.fixture
+def lan():
+    lan = GoveeLAN(listen_port=0, timeout=0.3)
+    yield lan
+    lan.close()
+
+
+@pytest.fixture
+def fake(lan):
+    fake = FakeGoveeDevice(DEVICE_ID, scan_port=0, control_port=0, reply_port=lan.sock.getsockname()[1])
+    lan.scan_addresses = [fake.scan_address]
+    lan.control_port = fake.control_port
+    fake.start()
+    yield fake
+    if fake.running:
+        fake.stop()
+
+
+def test_discover_and_status(lan, fake):
+    assert lan.discover() == {DEVICE_ID: {"ip": fake.host, "sku": "H6003"}}
+
+    lan.turn(fake.host, True)
+    lan.brightness(fake.host, 40)
+
+    status = lan.status(fake.host)
+    assert status["onOff"] == 1
+    assert status["brightness"] == 40
+
+
+def test_status_is_none_when_device_is_offline(lan, fake):
+    lan.discover()
+    fake.stop()
+
+    assert lan.status(fake.host) is None
+
+
+def test_lan_control_confirms_delivery(lan, fake, monkeypatch):
+    for module in ("requests", "dotenv"):
+        pytest.importorskip(module)
+    import govee
+
+    monkeypatch.setattr(govee.Govee, "lan", lan)
+    lan.discover()
+    device = govee.Govee("Test Lamp", "H6003", DEVICE_ID.lower())
+    ip = lan.address_for(device.device_id)
+
+    assert device.lan_control(ip, "turn", "on") is True
+    assert device.lan_control(ip, "color", {"r": 0, "g": 0, "b": 255}) is True
+    assert fake.state["onOff"] == 1
+    assert fake.state["color"] == {"r": 0, "g": 0, "b": 255}
+
+    fake.stop()
+
+    # An offline device swallows the command; the caller must fall back to the cloud
+    assert device.lan_control(ip, "turn", "off") is False
+    assert lan.address_for(device.device_id) is None
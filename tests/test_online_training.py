@@ -0,0 +1,33 @@
+import csv
+import pytest
+
+for module in ("numpy", "pandas", "joblib", "sklearn", "spacy"):
+    pytest.importorskip(module)
+
+import online_training
+
+
+def test_append_rows_to_file_without_trailing_newline(tmp_path, monkeypatch):
+    dataset = tmp_path / "SalutationDatabase.csv"
+    dataset.write_bytes("Utterance,Label\r\nYou didn’t read my emails,Error".encode("utf-8"))
+    monkeypatch.setitem(online_training.DATASETS, "Salutation", (str(dataset), "Utterance"))
+
+    online_training.append_rows("Salutation", ["hey there atom"], ["General"])
+
+    with open(dataset, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["Utterance", "Label"],
+        ["You didn’t read my emails", "Error"],
+        ["hey there atom", "General"],
+    ]
+
+
+def test_append_rows_keeps_existing_line_break(tmp_path, monkeypatch):
+    dataset = tmp_path / "IntentLabelingDataset.csv"
+    dataset.write_bytes(b"Command,Label\r\nturn on the lamp,IoT\r\n")
+    monkeypatch.setitem(online_training.DATASETS, "Intent", (str(dataset), "Command"))
+
+    online_training.append_rows("Intent", ["dim the lamp"], ["IoT"])
+
+    assert dataset.read_bytes() == b"Command,Label\r\nturn on the lamp,IoT\r\ndim the lamp,IoT\r\n"
@@ -0,0 +1,65 @@
+# text_resources.py
+"""
+Offline tokenizer and stopword data.
+
+The stopword set below is NLTK's English list, frozen so that importing it never
+touches the network or the nltk_data directory. Run this file directly on a box
+that has nltk installed to regenerate the literal after an NLTK upgrade.
+"""
+import re
+
+STOP_WORDS = frozenset({
+    "a", "about", "above", "after", "again", "against", "ain", "all", "am",
+    "an", "and", "any", "are", "aren", "aren't", "as", "at", "be", "because",
+    "been", "before", "being", "below", "between", "both", "but", "by", "can",
+    "couldn", "couldn't", "d", "did", "didn", "didn't", "do", "does", "doesn",
+    "doesn't", "doing", "don", "don't", "down", "during", "each", "few", "for",
+    "from", "further", "had", "hadn", "hadn't", "has", "hasn", "hasn't", "have",
+    "haven", "haven't", "having", "he", "her", "here", "hers", "herself", "him",
+    "himself", "his", "how", "i", "if", "in", "into", "is", "isn", "isn't", "it",
+    "it's", "its", "itself", "just", "ll", "m", "ma", "me", "mightn", "mightn't",
+    "more", "most", "mustn", "mustn't", "my", "myself", "needn", "needn't", "no",
+    "nor", "not", "now", "o", "of", "off", "on", "once", "only", "or", "other",
+    "our", "ours", "ourselves", "out", "over", "own", "re", "s", "same", "shan",
+    "shan't", "she", "she's", "should", "should've", "shouldn", "shouldn't", "so",
+    "some", "such", "t", "than", "that", "that'll", "the", "their", "theirs",
+    "them", "themselves", "then", "there", "these", "they", "this", "those",
+    "through", "to", "too", "under", "until", "up", "ve", "very", "was", "wasn",
+    "wasn't", "we", "were", "weren", "weren't", "what", "when", "where", "which",
+    "while", "who", "whom", "why", "will", "with", "won", "won't", "wouldn",
+    "wouldn't", "y", "you", "you'd", "you'll", "you're", "you've", "your",
+    "yours", "yourself", "yourselves",
+})
+
+# Approximates NLTK's Treebank word tokenizer for short spoken commands:
+# contractions are split off ("don't" -> "do", "n't"), numbers keep their
+# decimal point, and every other punctuation mark becomes its own token.
+_TOKEN_PATTERN = re.compile(
+    r"\w+(?=n't\b)|n't\b|'(?:s|m|d|ll|re|ve)\b|\d+(?:\.\d+)?|\w+|[^\w\s]",
+    re.IGNORECASE,
+)
+
+
+def word_tokenize(text):
+    """Split text into word and punctuation tokens without any external data."""
+    return _TOKEN_PATTERN.findall(text)
+
+
+def _build_stop_words():
+    """Print a fresh STOP_WORDS literal from the locally installed NLTK corpus."""
+    from nltk.corpus import stopwords
+    words = sorted(set(stopwords.words('english')))
+    print("STOP_WORDS = frozenset({")
+    line = "   "
+    for word in words:
+        item = f' "{word}",'
+        if len(line) + len(item) > 79:
+            print(line)
+            line = "   "
+        line += item
+    print(line)
+    print("})")
+
+
+if __name__ == "__main__":
+    _build_stop_words()
@@ -0,0 +1,140 @@
+# tracing.py
+"""
+Span-based latency tracing for a conversational turn.
+
+Each span (wake word, listen, check_exit, intent_finder, HTTP call, TTS
+synthesis/playback...) is written as one JSON line carrying the turn ID it
+belongs to. Running this file summarizes p50/p95/p99 per stage:
+
+    python tracing.py [atom_trace.log]
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextlib
+from collections import defaultdict
+from urllib.parse import urlparse
+
+TRACE_FILE = 'atom_trace.log'
+
+trace_logger = logging.getLogger('atom.trace')
+trace_logger.propagate = False
+trace_logger.setLevel(logging.INFO)
+
+_local = threading.local()
+
+
+def enable_tracing(path=TRACE_FILE):
+    """Start writing spans to path. Spans are dropped until this is called."""
+    if not trace_logger.handlers:
+        from atom_logging import background_handler
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        trace_logger.addHandler(background_handler(handler))
+
+
+def new_turn():
+    """Start a new turn on this thread and return its ID."""
+    _local.turn_id = uuid.uuid4().hex[:12]
+    return _local.turn_id
+
+
+def current_turn():
+    return getattr(_local, 'turn_id', None)
+
+
+def set_turn(turn_id):
+    """Attach this thread's spans to an existing turn (e.g. in a worker thread)."""
+    _local.turn_id = turn_id
+
+
+@contextlib.contextmanager
+def span(stage, **attrs):
+    """
+    Time the enclosed block as one stage of the current turn. The yielded dict
+    can be filled with extra attributes to record alongside the timing.
+    """
+    start = time.perf_counter()
+    started_at = time.time()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if trace_logger.handlers:
+            record = {
+                "turn": current_turn(),
+                "stage": stage,
+                "start": round(started_at, 6),
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+                **attrs,
+            }
+            if error:
+                record["error"] = error
+            trace_logger.info(json.dumps(record, default=str))
+
+
+def install_http_tracing():
+    """Record every outbound requests call (including spotipy's) as an 'http' span."""
+    import requests
+    if getattr(requests.Session.request, '_traced', False):
+        return
+    original = requests.Session.request
+
+    @functools.wraps(original)
+    def request(self, method, url, *args, **kwargs):
+        with span('http', method=method, host=urlparse(url).netloc) as attrs:
+            response = original(self, method, url, *args, **kwargs)
+            attrs['status'] = response.status_code
+            return response
+
+    request._traced = True
+    requests.Session.request = request
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(path=TRACE_FILE):
+    """Return {stage: {count, p50, p95, p99, max}} in milliseconds from a trace file."""
+    durations = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            durations[record['stage']].append(record['ms'])
+    summary = {}
+    for stage, values in durations.items():
+        values.sort()
+        summary[stage] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1],
+        }
+    return summary
+
+
+def print_summary(path=TRACE_FILE):
+    summary = summarize(path)
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'max ms':>12}")
+    for stage, stats in sorted(summary.items(), key=lambda item: -item[1]['p50']):
+        print(f"{stage:<16}{stats['count']:>8}{stats['p50']:>12.1f}{stats['p95']:>12.1f}"
+              f"{stats['p99']:>12.1f}{stats['max']:>12.1f}")
+
+
+if __name__ == "__main__":
+    print_summary(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE)
@@ -0,0 +1,117 @@
+# tts_cache.py
+"""
+Content-addressed store of synthesized speech.
+
+Each clip is saved as tts_cache/<sha256>.wav, where the hash covers the text
+and the voice settings. A phrase is synthesized once and then reused by the
+speakers and by every web client. The bytes behind a key never change, so
+web clients may cache /audio/<key> for good. Once the directory grows past
+MAX_BYTES, the least recently used clips are deleted. Every use touches a
+clip's mtime, because atime is often not kept. http_response() serves a clip
+with an ETag, an immutable Cache-Control header and byte ranges, for
+whichever web server is in use.
+"""
+import os
+import re
+import hashlib
+import threading
+
+CACHE_DIR = 'tts_cache'
+URL_PREFIX = '/audio/'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# LLM answers and weather reports are spoken too, so the cache needs a ceiling
+MAX_BYTES = 200 * 1024 * 1024
+
+_KEY = re.compile(r'[0-9a-f]{64}')
+_prune_lock = threading.Lock()
+
+
+def audio_key(text, settings):
+    return hashlib.sha256(f"{settings}|{text}".encode('utf-8')).hexdigest()
+
+
+def audio_path(key):
+    """Path of the clip for key, or None for anything that is not a key."""
+    if not _KEY.fullmatch(key):
+        return None
+    return os.path.join(CACHE_DIR, f"{key}.wav")
+
+
+def audio_url(key):
+    return f"{URL_PREFIX}{key}"
+
+
+def touch(key):
+    """Mark a clip as just used. Returns False if it is not cached."""
+    try:
+        os.utime(audio_path(key))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def store(key, audio):
+    """Write a clip atomically, so a reader never sees half a file, then prune."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = audio_path(key)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(audio)
+    os.replace(temp_path, path)
+    prune()
+
+
+def prune(max_bytes=MAX_BYTES):
+    """Delete the least recently used clips until the cache fits in max_bytes."""
+    with _prune_lock:
+        clips = []
+        for entry in os.scandir(CACHE_DIR):
+            if entry.name.endswith('.wav'):
+                stat = entry.stat()
+                clips.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in clips)
+        for _, size, path in sorted(clips):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def read(key):
+    with open(audio_path(key), 'rb') as f:
+        return f.read()
+
+
+def http_response(key, if_none_match=None, range_header=None):
+    """(status, headers, body) for GET /audio/<key>, honouring If-None-Match and a single byte range."""
+    path = audio_path(key)
+    if path is None or not os.path.exists(path):
+        return 404, {}, b''
+    etag = f'"{key}"'
+    headers = {'Content-Type': 'audio/wav', 'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Accept-Ranges': 'bytes'}
+    # A 64-character hash cannot match by accident, so a substring test covers lists and W/ tags
+    if if_none_match and (if_none_match.strip() == '*' or etag in if_none_match):
+        return 304, headers, b''
+
+    size = os.path.getsize(path)
+    start, end, status = 0, size - 1, 200
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', (range_header or '').strip())
+    if match and (match.group(1) or match.group(2)):
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:
+            start = max(size - int(match.group(2)), 0)  # bytes=-N: the last N bytes
+        if start > end:
+            return 416, {**headers, 'Content-Range': f'bytes */{size}'}, b''
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    # Clips are a few hundred KB at most
+    with open(path, 'rb') as f:
+        f.seek(start)
+        body = f.read(end - start + 1)
+    headers['Content-Length'] = str(len(body))
+    return status, headers, body